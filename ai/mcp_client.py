@@ -1,12 +1,21 @@
 import os
+import re
 import asyncio
-import json
 from dotenv import dotenv_values
-from agents import Agent, Runner, gen_trace_id, trace
-from agents.mcp import MCPServerStdio
+from agents import Agent, ModelSettings, Runner, gen_trace_id, trace
+from agents.exceptions import MaxTurnsExceeded
+from agents.mcp import MCPServerStdio, create_static_tool_filter
 from core.parser import parse_redfin_property
-from core.scraper import get_starting_url
-from ai.utils import extract_tool_output, extract_locations
+from core.scraper import get_starting_url, looks_blocked, REDFIN_HOST
+from core.traffic import governor, BlockedError
+from ai.navigation import (
+    NavigationCache,
+    build_filter_url,
+    criteria_shape,
+    extract_filters,
+    filters_applied,
+)
+from ai.utils import extract_tool_output, extract_locations, trim_snapshot
 
 
 # Get centralized logger
@@ -17,6 +26,88 @@ log = logging.getLogger(__name__)
 # Load API key
 os.environ["OPENAI_API_KEY"] = dotenv_values(".env")["OPENAI_API_KEY"]
 mcp_instance = None  # Global MCP server instance
+mcp_lock = asyncio.Lock()  # The MCP server drives a single browser, so one run at a time
+navigator = None  # NavigatorAgent, built once and reused for every run
+navigation_cache = NavigationCache()
+
+# Budget for a single navigator run, after which we scrape whatever is on the page
+AGENT_MAX_TURNS = 8
+AGENT_TIME_BUDGET = 90  # seconds
+
+# Only the tools needed to set filters are offered to the model
+NAVIGATOR_TOOLS = [
+    "browser_snapshot",
+    "browser_click",
+    "browser_type",
+    "browser_select_option",
+    "browser_press_key",
+    "browser_wait_for",
+]
+
+PAGE_URL_RE = re.compile(r"Page URL:\s*(\S+)")
+
+# Kept identical between runs (criteria go in the input instead) so the provider
+# can reuse its prompt cache for the instructions and tool definitions
+NAVIGATOR_INSTRUCTIONS = """You are a web navigation expert for Redfin.com.
+
+The Redfin rentals results page is already open in the browser. The user message
+contains the user criteria.
+
+Your task:
+1. Apply filters based on the user criteria (price, beds, baths, etc.).
+2. Wait for results to load on the same page.
+3. DO NOT click pagination or navigate to new URLs.
+4. Once filters are applied and listings are visible, respond ONLY with: "FILTERS_APPLIED".
+
+Hard restrictions:
+- Never navigate to another URL.
+- Never click pagination or external links.
+- Stay on the current DOM context at all times.
+
+Page snapshots only list the filter controls, not the listings.
+
+Stop tool use immediately after filters are applied.
+"""
+
+# Returns the page HTML without styles and scripts, except the ones carrying
+# listing data (JSON-LD and the server state) that the parser reads first
+PAGE_HTML_FUNCTION = """async () => {
+    document.querySelectorAll('script, style').forEach(el => {
+        if (el.type === 'application/ld+json') return;
+        if (el.tagName === 'SCRIPT' && el.textContent.includes('__reactServerState')) return;
+        el.remove();
+    });
+    return document.documentElement.outerHTML;
+}"""
+
+
+class NavigatorMCPServer(MCPServerStdio):
+    """
+    Playwright MCP server that trims page snapshots down to the filter controls
+    before the model sees them, and keeps track of the current page URL.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_url = None
+        self.on_page_url = None  # Called with every new page URL during a run
+
+    async def call_tool(self, tool_name, arguments):
+        result = await super().call_tool(tool_name, arguments)
+
+        content = []
+        for block in getattr(result, "content", None) or []:
+            text = getattr(block, "text", None)
+            if isinstance(text, str):
+                match = PAGE_URL_RE.search(text)
+                if match and match.group(1) != self.page_url:
+                    self.page_url = match.group(1)
+                    if self.on_page_url:
+                        self.on_page_url(self.page_url)
+                block = block.model_copy(update={"text": trim_snapshot(text)})
+            content.append(block)
+
+        return result.model_copy(update={"content": content})
 
 
 async def get_mcp_server():
@@ -35,7 +126,7 @@ async def get_mcp_server():
     if mcp_instance is None:
         log.info("🚀 Launching global MCP server...")
 
-        mcp_instance = MCPServerStdio(
+        mcp_instance = NavigatorMCPServer(
             name="Playwright",
             params={
                 "command": "npx",
@@ -48,7 +139,9 @@ async def get_mcp_server():
                     userAgent,
                 ],
             },
-            cache_tools_list=False,
+            # A stable tool list keeps the prompt prefix identical between runs
+            cache_tools_list=True,
+            tool_filter=create_static_tool_filter(allowed_tool_names=NAVIGATOR_TOOLS),
             client_session_timeout_seconds=120,
         )
         await mcp_instance.__aenter__()  # Start it once
@@ -57,52 +150,151 @@ async def get_mcp_server():
 
 
 async def shutdown_mcp():
-    global mcp_instance
+    global mcp_instance, navigator
     if mcp_instance:
         log.info("🧹 Shutting down MCP server...")
         await mcp_instance.__aexit__(None, None, None)
         mcp_instance = None
+        navigator = None
+
+
+def get_navigator(mcp):
+    """Return the NavigatorAgent, building it the first time."""
+    global navigator
+    if navigator is None:
+        navigator = Agent(
+            name="NavigatorAgent",
+            model="gpt-5-mini",
+            mcp_servers=[mcp],
+            instructions=NAVIGATOR_INSTRUCTIONS,
+            model_settings=ModelSettings(
+                extra_args={"prompt_cache_key": "redfin-navigator"}
+            ),
+        )
+    return navigator
+
+
+async def close_browser():
+    """
+    Close the MCP browser page so an interrupted run doesn't leave it mid-navigation.
+    The MCP server opens a fresh one on the next tool call.
+    """
+    if mcp_instance:
+        try:
+            await mcp_instance.call_tool("browser_close", {})
+        except Exception as e:
+            log.warning(f"⚠️  Could not close MCP browser: {e}")
+
+
+async def get_page_properties(mcp):
+    """Scrape the listings from the page currently open in the MCP browser."""
+    html_result = await mcp.call_tool("browser_evaluate", {"function": PAGE_HTML_FUNCTION})
+    html = extract_tool_output(html_result)
 
+    if looks_blocked(html):
+        raise BlockedError("Redfin served a block page instead of listings.")
 
-async def run_redfin_scraper(user_criteria: str, start_url: str):
+    return parse_redfin_property(html) if html else []
+
+
+async def run_redfin_scraper(
+    user_criteria: str,
+    start_url: str,
+    max_turns: int = AGENT_MAX_TURNS,
+    time_budget: float = AGENT_TIME_BUDGET,
+):
     """
     Main function to scrape Redfin based on user criteria.
 
     Args:
         user_criteria: String describing user criteria for filtering properties
         start_url: Starting Redfin URL
+        max_turns: Most LLM turns the navigator gets to apply the filters
+        time_budget: Most seconds the navigator gets to apply the filters
     """
 
     mcp = await get_mcp_server()
 
-    try:
-        # Navigation Agent - handles initial page load and filtering
-        navigator = Agent(
-            name="NavigatorAgent",
-            model="gpt-5-mini",
-            mcp_servers=[mcp],
-            instructions=f"""You are a web navigation expert for Redfin.com.
+    async with mcp_lock:
+        try:
+            return await _run_navigator(
+                mcp, user_criteria, start_url, max_turns, time_budget
+            )
+        except asyncio.CancelledError:
+            log.info("🛑 Scraper run cancelled, closing browser...")
+            await asyncio.shield(close_browser())
+            raise
+
 
-            User Criteria:
-            {json.dumps(user_criteria, indent=2)}
+async def _replay_navigation(mcp, start_url: str, filters: dict, entry: dict):
+    """Go straight to the filtered URL a previous run found. Returns the listings."""
+    url = build_filter_url(start_url, filters, entry)
+    log.info(f"⏩ Replaying cached navigation: {url}")
 
-            Your task:
-            1. Navigate ONCE to the starting URL.
-            2. Apply filters based on the user criteria (price, beds, baths, etc.).
-            3. Wait for results to load on the same page.
-            4. DO NOT click pagination or navigate to new URLs.
-            5. Once filters are applied and listings are visible, respond ONLY with: "FILTERS_APPLIED".
+    async with governor.attempt(REDFIN_HOST):
+        await mcp.call_tool("browser_navigate", {"url": url})
+        await mcp.call_tool("browser_wait_for", {"time": 2})
+        return await get_page_properties(mcp)
 
-            Hard restrictions:
-            - Never call browser_navigate() after the initial page load.
-            - Never click pagination or external links.
-            - Stay on the current DOM context at all times.
 
-            Use any MCP browser tools as needed to accomplish this.
+async def _run_agent(mcp, user_criteria: str, done, max_turns: int, time_budget: float):
+    """
+    Let the navigator apply the filters, stopping early once `done` is set.
+    Returns True if the filters look applied.
+    """
+    applied = asyncio.Event()
+    mcp.on_page_url = lambda url: applied.set() if done(url) else None
+
+    run = asyncio.create_task(
+        Runner.run(
+            starting_agent=get_navigator(mcp),
+            input=f"User Criteria:\n{user_criteria}\n\nApply the filters from the user criteria.",
+            max_turns=max_turns,
+        )
+    )
+    early_exit = asyncio.create_task(applied.wait())
 
-            Stop tool use immediately after filters are applied.
-            """,
+    try:
+        await asyncio.wait(
+            {run, early_exit}, timeout=time_budget, return_when=asyncio.FIRST_COMPLETED
         )
+    finally:
+        mcp.on_page_url = None
+        early_exit.cancel()
+        if not run.done():
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+
+    if applied.is_set():
+        log.info("✅ Filters show up in the page URL, stopping navigator early")
+        return True
+
+    if run.cancelled():
+        log.warning(f"⚠️ Navigator ran out of its {time_budget}s time budget.")
+        return False
+
+    try:
+        return "FILTERS_APPLIED" in run.result().final_output
+    except MaxTurnsExceeded:
+        log.warning(f"⚠️ Navigator ran out of its {max_turns} turn budget.")
+        return False
+
+
+async def _run_navigator(
+    mcp, user_criteria: str, start_url: str, max_turns: int, time_budget: float
+):
+    try:
+        filters = extract_filters(user_criteria)
+        shape = criteria_shape(user_criteria, extract_locations(user_criteria))
+        entry = navigation_cache.get(shape)
+
+        # Phase 0: Replay a previous run for the same kind of criteria, no LLM needed
+        if entry is not None:
+            properties = await _replay_navigation(mcp, start_url, filters, entry)
+            if properties:
+                return properties
+            log.warning("⚠️ Cached navigation found no listings, asking the navigator")
+            navigation_cache.forget(shape)
 
         trace_id = gen_trace_id()
         log.info(
@@ -110,43 +302,45 @@ async def run_redfin_scraper(user_criteria: str, start_url: str):
         )
 
         with trace(workflow_name="RedfinPropertyScraper", trace_id=trace_id):
-            log.debug("📋 Search Criteria:", user_criteria)
+            log.debug(f"📋 Search Criteria: {user_criteria}")
             log.debug(f"🌐 Starting URL: {start_url}")
 
             # Phase 1: Navigate and apply filters
             log.info("🔍 Navigating and applying filters...")
 
-            nav_result = await Runner.run(
-                starting_agent=navigator,
-                input=f"Navigate to {start_url} and apply the filters from the user criteria.",
-                max_turns=15,
-            )
+            # The agent drives Redfin directly, so the whole run counts as one request
+            async with governor.attempt(REDFIN_HOST):
+                # Open the page ourselves rather than spending an LLM turn on it
+                await mcp.call_tool("browser_navigate", {"url": start_url})
 
-            log.info("✅ Navigation complete")
-
-            # Check if filters were applied
-            if "FILTERS_APPLIED" not in nav_result.final_output:
-                log.warning(
-                    "⚠️ Warning: Filters may not have been fully applied. Continuing anyway..."
-                )
-            log.info("Scraping property listings...")
-
-            # Phase 2: Get HTML and scrape property listings
-            html_result = await mcp.call_tool(
-                "browser_evaluate",
-                {
-                    "function": """async () => {
-                document.querySelectorAll('script, style').forEach(el => el.remove());
-                return document.documentElement.outerHTML;
-                }"""
-                },
-            )
+                # Only stop early when the URL can show every filter we were asked for
+                def done(url):
+                    return (
+                        bool(filters)
+                        and shape is not None
+                        and "+" not in shape
+                        and filters_applied(url, filters)
+                    )
+
+                applied = await _run_agent(mcp, user_criteria, done, max_turns, time_budget)
+
+                log.info("✅ Navigation complete")
+
+                # Check if filters were applied
+                if not applied:
+                    log.warning(
+                        "⚠️ Warning: Filters may not have been fully applied. Continuing anyway..."
+                    )
+                log.info("Scraping property listings...")
 
-            html = extract_tool_output(html_result)
+                # Phase 2: Get HTML and scrape property listings
+                properties = await get_page_properties(mcp)
 
-            properties = parse_redfin_property(html)
+                # Remember how this kind of criteria was applied for next time
+                if applied and properties and filters_applied(mcp.page_url, filters):
+                    navigation_cache.learn(shape, filters, mcp.page_url)
 
-            return properties
+                return properties
     except Exception as e:
         log.warning(f"⚠️  Scraper error: {e}")
         raise e
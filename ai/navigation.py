@@ -0,0 +1,283 @@
+import os
+import re
+import json
+
+# Get centralized logger
+import logging
+
+log = logging.getLogger(__name__)
+
+
+# Criteria slot -> key Redfin uses for it in the "/filter/" part of the URL
+SLOT_KEYS = {
+    "max_price": "max-price",
+    "min_price": "min-price",
+    "min_beds": "min-beds",
+    "min_baths": "min-baths",
+}
+
+PRICE_SLOTS = ("max_price", "min_price")
+
+NUM = r"(\d[\d,]*(?:\.\d+)?)"
+NOT_ROOMS = r"(?!\s*\+?\s*-?\s*(?:bed|bath|br\b|ba\b))"
+
+SLOT_PATTERNS = {
+    "max_price": re.compile(
+        r"(?:under|below|less than|max(?:imum)?|up to|at most|no more than|<=?|≤)\s*\$?\s*"
+        + NUM
+        + r"\s*(k\b)?"
+        + NOT_ROOMS
+    ),
+    "min_price": re.compile(
+        r"(?:over|above|more than|at least|min(?:imum)?|from|>=?|≥)\s*\$\s*"
+        + NUM
+        + r"\s*(k\b)?"
+    ),
+    "min_beds": re.compile(
+        r"(?:at least|min(?:imum)?|>=?|≥)?\s*(\d+)\s*\+?\s*-?\s*(?:bed(?:room)?s?|br)\b"
+    ),
+    "min_baths": re.compile(
+        r"(?:at least|min(?:imum)?|>=?|≥)?\s*(\d+(?:\.\d+)?)\s*\+?\s*-?\s*(?:bath(?:room)?s?|ba)\b"
+    ),
+}
+
+ROOMS = r"\s*\+?\s*-?\s*(?:bed|bath|br\b|ba\b)"
+
+# Things the slot patterns can't express. They are blanked out before reading the
+# filters and make the criteria unreplayable, e.g. "max 2 beds" is not min_beds=2.
+UNHANDLED_PATTERNS = (
+    # Ranges: "1-2 beds", "$2k-3k", "2 to 3 baths"
+    re.compile(
+        r"\$?\s*\d[\d,]*(?:\.\d+)?\s*k?\s*(?:-|–|to)\s*\$?\s*\d[\d,]*(?:\.\d+)?\s*k?\b"
+    ),
+    # Upper bounds on rooms: "max 2 beds", "under 2 baths"
+    re.compile(
+        r"(?:under|below|less than|fewer than|max(?:imum)?|up to|at most|no more than|<=?|≤)\s*"
+        r"\d+(?:\.\d+)?"
+        + ROOMS
+    ),
+    # "2 beds or less", "1 bath or fewer"
+    re.compile(r"\d+(?:\.\d+)?" + ROOMS + r"\w*\s+or\s+(?:less|fewer|under|below)"),
+)
+
+# Amenities we recognise in the criteria. They can't be read back from the URL
+# by name, so they are only replayed once a run has shown which tokens they add.
+FEATURE_PATTERNS = {
+    "dogs": re.compile(r"\bdogs?\b"),
+    "cats": re.compile(r"\bcats?\b"),
+    "pets": re.compile(r"\bpets?\b"),
+    "parking": re.compile(r"\b(?:parking|garage)\b"),
+    "laundry": re.compile(r"\b(?:laundry|washer|dryer|w/d)\b"),
+    "furnished": re.compile(r"\bfurnished\b"),
+    "pool": re.compile(r"\bpool\b"),
+    "gym": re.compile(r"\b(?:gym|fitness)\b"),
+    "air_conditioning": re.compile(r"\b(?:air conditioning|a/c)\b"),
+}
+
+# Words that don't change which filters a search needs
+FILLER_WORDS = set(
+    """
+    a an the and or of to for in at on near with within that which who are is be
+    have has having i me my we our want need looking look find show get collect
+    search list all any some please only just around about
+    apartment apartments apt apts home homes house houses condo condos townhouse
+    townhouses unit units place places rental rentals rent renting listing listings
+    property properties lease leasing
+    friendly allowed ok okay accepted welcome
+    under below less than more over above least most max maximum min minimum up
+    no from price priced budget cost costs per month monthly mo dollars usd k
+    bed beds bedroom bedrooms br bath baths bathroom bathrooms ba
+    """.split()
+)
+
+
+def extract_filters(criteria: str):
+    """
+    Pull the filters we know how to put in a Redfin URL out of a natural language
+    goal, e.g. "2+ beds under $3k" -> {"min_beds": 2, "max_price": 3000}.
+    """
+    text = strip_unhandled(criteria.lower())
+    filters = {}
+
+    for slot, pattern in SLOT_PATTERNS.items():
+        match = pattern.search(text)
+        if not match:
+            continue
+        value = float(match.group(1).replace(",", ""))
+        if slot in PRICE_SLOTS:
+            if match.group(2):
+                value *= 1000
+            if value < 100:  # Not a rent
+                continue
+        filters[slot] = int(value) if value.is_integer() else value
+
+    return filters
+
+
+def strip_unhandled(text: str):
+    """Blank out the parts of the criteria no slot pattern can read correctly."""
+    for pattern in UNHANDLED_PATTERNS:
+        text = pattern.sub(" ", text)
+    return text
+
+
+def criteria_shape(criteria: str, locations: list[str] | None = None):
+    """
+    The kind of search the criteria asks for: which slots and amenities it uses,
+    but not their values. Two goals with the same shape apply filters the same way.
+
+    Returns None when the criteria contains something we don't understand, so it
+    never gets replayed without the LLM.
+    """
+    text = criteria.lower()
+    for location in locations or []:
+        text = text.replace(location.lower(), " ")
+
+    if text != strip_unhandled(text):
+        log.debug("Criteria not replayable, it has a range or bound we can't express")
+        return None
+
+    slots = []
+    for slot, pattern in SLOT_PATTERNS.items():
+        if pattern.search(text):
+            slots.append(slot)
+            text = pattern.sub(" ", text)
+
+    features = []
+    for feature, pattern in FEATURE_PATTERNS.items():
+        if pattern.search(text):
+            features.append(feature)
+            text = pattern.sub(" ", text)
+
+    # Any number left over is a value we didn't read, e.g. "over 2000" without "$"
+    leftover = [
+        word
+        for word in re.findall(r"[a-z]+|\d+", text)
+        if word.isdigit() or (len(word) > 2 and word not in FILLER_WORDS)
+    ]
+    if leftover:
+        log.debug(f"Criteria not replayable, unknown words: {leftover}")
+        return None
+
+    return "|".join(sorted(slots) + sorted(f"+{feature}" for feature in features))
+
+
+def url_filter_tokens(url: str | None):
+    """Return the comma separated tokens after "/filter/" in a Redfin URL."""
+    if not url or "/filter/" not in url:
+        return []
+    segment = url.split("/filter/", 1)[1].split("?", 1)[0].strip("/")
+    return [token for token in segment.split(",") if token]
+
+
+def parse_filter_value(text: str):
+    """Read a value from a URL filter token, e.g. "2.5k" -> 2500.0, "2" -> 2.0."""
+    text = text.strip().lower()
+    multiplier = 1
+    if text.endswith("k"):
+        text, multiplier = text[:-1], 1000
+    elif text.endswith("m"):
+        text, multiplier = text[:-1], 1_000_000
+    try:
+        return float(text) * multiplier
+    except ValueError:
+        return None
+
+
+def filters_applied(url: str | None, filters: dict, extra_tokens=()):
+    """
+    Check if the page URL shows every filter from the criteria with the value we
+    asked for, so the navigator can stop without spending more turns on it.
+    """
+    tokens = url_filter_tokens(url)
+    values = {}
+    for token in tokens:
+        key, _, value = token.partition("=")
+        values[key] = parse_filter_value(value)
+
+    for slot, wanted in filters.items():
+        value = values.get(SLOT_KEYS[slot])
+        if value is None or abs(value - wanted) > 1e-6:
+            return False
+    return all(token in tokens for token in extra_tokens)
+
+
+def format_price(value, unit: str):
+    if unit == "k":
+        return f"{value / 1000:g}k"
+    return str(int(value))
+
+
+def build_filter_url(start_url: str, filters: dict, entry: dict):
+    """Build the filtered results URL for the criteria from a cached entry."""
+    base = start_url.split("/filter/", 1)[0].split("?", 1)[0].rstrip("/")
+
+    tokens = []
+    for slot, value in filters.items():
+        if slot in PRICE_SLOTS:
+            value = format_price(value, entry.get("price_unit", "k"))
+        elif isinstance(value, float):
+            value = f"{value:g}"
+        tokens.append(f"{SLOT_KEYS[slot]}={value}")
+    tokens.extend(entry.get("extra_tokens", []))
+
+    if not tokens:
+        return base
+    return f"{base}/filter/{','.join(tokens)}"
+
+
+class NavigationCache:
+    """
+    What a successful navigator run did for each criteria shape, stored as the
+    URL filter tokens it ended up with, so the same shape can be replayed by
+    navigating straight to the filtered URL without calling the LLM.
+    """
+
+    def __init__(self, path: str = ".navigation_cache.json"):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                log.warning(f"⚠️  Could not load navigation cache: {e}")
+
+    def get(self, shape: str | None):
+        if shape is None:
+            return None
+        return self.entries.get(shape)
+
+    def learn(self, shape: str | None, filters: dict, url: str):
+        """Remember how the filters for this shape showed up in the final URL."""
+        if shape is None:
+            return
+
+        tokens = url_filter_tokens(url)
+        slot_keys = {SLOT_KEYS[slot] for slot in filters}
+        extra_tokens = [t for t in tokens if t.split("=", 1)[0] not in slot_keys]
+
+        # Amenities have to show up as their own tokens, or there's nothing to replay
+        if "+" in shape and not extra_tokens:
+            return
+
+        price_tokens = [
+            t for t in tokens if t.split("=", 1)[0] in ("max-price", "min-price")
+        ]
+        price_unit = "k" if any(t.endswith("k") for t in price_tokens) else ""
+
+        self.entries[shape] = {"extra_tokens": extra_tokens, "price_unit": price_unit}
+        self._save()
+        log.info(f"🧠 Learned navigation for criteria shape '{shape or 'none'}'")
+
+    def forget(self, shape: str | None):
+        """Drop an entry whose replay stopped working."""
+        if self.entries.pop(shape, None) is not None:
+            self._save()
+
+    def _save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2)
+        except OSError as e:
+            log.warning(f"⚠️  Could not save navigation cache: {e}")
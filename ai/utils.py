@@ -1,7 +1,7 @@
 import json
 import spacy
 
-nlp = spacy.load("en_core_web_sm")
+nlp = None  # spaCy pipeline, loaded the first time a location is extracted
 
 CITY_MAP = {
     "la": "Los Angeles",
@@ -17,11 +17,19 @@ CITY_MAP = {
 }
 
 
+def get_nlp():
+    """Return the spaCy pipeline, loading it the first time."""
+    global nlp
+    if nlp is None:
+        nlp = spacy.load("en_core_web_sm")
+    return nlp
+
+
 def extract_locations(text: str):
     """
     Extracts location from the given string using spaCy NLP.
     """
-    doc = nlp(text)
+    doc = get_nlp()(text)
     locations = []
 
     for ent in doc.ents:
@@ -77,3 +85,84 @@ def extract_tool_output(result):
             return block.data
 
     return None
+
+
+# Roles the navigator needs to set filters, kept whatever their label says
+FILTER_CONTROL_ROLES = (
+    "combobox",
+    "option",
+    "listbox",
+    "checkbox",
+    "radio",
+    "spinbutton",
+    "slider",
+    "switch",
+    "textbox",
+    "dialog",
+)
+
+# Buttons / links are only kept if they look like they belong to the filters
+FILTER_KEYWORDS = (
+    "price",
+    "bed",
+    "bath",
+    "filter",
+    "apply",
+    "done",
+    "min",
+    "max",
+    "pet",
+    "dog",
+    "cat",
+    "home type",
+    "more",
+    "reset",
+    "clear",
+    "see ",
+    "show ",
+    "close",
+)
+
+MAX_SNAPSHOT_LINES = 250
+
+
+def trim_snapshot(text: str):
+    """
+    Cut a Playwright MCP page snapshot down to the filter controls.
+
+    The full accessibility tree of a results page (every listing card, photo and
+    footer link) is most of what the navigator model reads on each turn, while
+    only the filter bar and filter dialogs matter to it. Anything outside the
+    "Page Snapshot" yaml block is left alone.
+    """
+    if not isinstance(text, str) or "Page Snapshot" not in text:
+        return text
+
+    head, _, rest = text.partition("Page Snapshot")
+    start = rest.find("```yaml")
+    end = rest.find("```", start + 7)
+    if start == -1 or end == -1:
+        return text
+
+    kept = []
+    for line in rest[start + 7 : end].splitlines():
+        entry = line.strip().removeprefix("- ").lower()
+        role = entry.split(" ", 1)[0].rstrip(":")
+        if role in FILTER_CONTROL_ROLES or (
+            role in ("button", "link", "menuitem", "tab")
+            and any(keyword in entry for keyword in FILTER_KEYWORDS)
+        ):
+            kept.append(line)
+
+    if len(kept) > MAX_SNAPSHOT_LINES:
+        kept = kept[:MAX_SNAPSHOT_LINES] + ["# ... snapshot truncated"]
+
+    return (
+        head
+        + "Page Snapshot (filter controls only)"
+        + rest[:start]
+        + "```yaml\n"
+        + "\n".join(kept)
+        + "\n"
+        + rest[end:]
+    )
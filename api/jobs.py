@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import itertools
+
+# Get centralized logger
+import logging
+
+log = logging.getLogger(__name__)
+
+
+# Lower number runs first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    """
+    A single scrape request and everything we know about it.
+    """
+
+    def __init__(self, kind: str, params: dict, priority: str = "normal"):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.priority = priority
+        self.status = QUEUED
+        self.progress = "Waiting in queue"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task: asyncio.Task | None = None
+
+        # Bumped on every change so subscribers know when to send an update
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    def update(self, **fields):
+        """Set fields on the job and wake up anyone waiting for changes."""
+        for key, value in fields.items():
+            setattr(self, key, value)
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_update(self, version: int, timeout: float | None = None):
+        """Wait until the job has changed past the given version."""
+        if self.version != version:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def to_dict(self, include_result: bool = True):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            data["count"] = len(self.result) if self.result else 0
+            data["properties"] = self.result
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        job = cls(data["kind"], data["params"], data["priority"])
+        job.id = data["job_id"]
+        job.status = data["status"]
+        job.progress = data["progress"]
+        job.error = data["error"]
+        job.result = data.get("properties")
+        job.created_at = data["created_at"]
+        job.started_at = data["started_at"]
+        job.finished_at = data["finished_at"]
+        return job
+
+
+class JobManager:
+    """
+    Bounded priority queue of scrape jobs served by a fixed pool of workers.
+
+    Finished jobs are written to `results_dir` and kept for `result_ttl` seconds
+    so clients can come back for them after the request that submitted them is gone.
+    """
+
+    def __init__(
+        self,
+        runners: dict,
+        max_workers: int = 2,
+        max_queued: int = 1000,
+        result_ttl: int = 3600,
+        results_dir: str = ".jobs",
+    ):
+        # kind -> async function(job) returning the listings
+        self.runners = runners
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.results_dir = results_dir
+
+        self.jobs: dict[str, Job] = {}
+        self._queue: asyncio.PriorityQueue | None = None
+        self._counter = itertools.count()  # Keeps FIFO order within a priority
+        self._workers: list[asyncio.Task] = []
+        self._janitor: asyncio.Task | None = None
+
+    async def start(self):
+        """Start the worker pool and the expired-result cleanup loop."""
+        os.makedirs(self.results_dir, exist_ok=True)
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.max_workers)
+        ]
+        self._janitor = asyncio.create_task(self._purge_loop())
+        log.info(f"🧵 Job manager started with {self.max_workers} workers")
+
+    async def stop(self):
+        """Cancel running jobs and stop all workers."""
+        for job in list(self.jobs.values()):
+            if not job.finished:
+                await self.cancel(job.id)
+
+        tasks = [*self._workers, self._janitor]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._janitor = None
+        log.info("🧹 Job manager stopped")
+
+    def submit(self, kind: str, params: dict, priority: str = "normal"):
+        """
+        Queue a new job and return it. Raises QueueFullError if we are at capacity.
+        """
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"Unknown priority: {priority} (expected one of {', '.join(PRIORITIES)})"
+            )
+        if self._queue.qsize() >= self.max_queued:
+            raise QueueFullError("Job queue is full, try again later.")
+
+        job = Job(kind, params, priority)
+        self.jobs[job.id] = job
+        self._queue.put_nowait((PRIORITIES[priority], next(self._counter), job.id))
+        log.info(f"📥 Queued {kind} job {job.id} ({priority})")
+        return job
+
+    def get(self, job_id: str):
+        """Return the job from memory, or from disk if it already finished."""
+        job = self.jobs.get(job_id)
+        if job:
+            return job
+
+        try:
+            path = self._result_path(job_id)
+        except ValueError:
+            return None
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return Job.from_dict(json.load(f))
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            log.warning(f"⚠️  Could not load job {job_id}: {e}")
+            return None
+
+    async def cancel(self, job_id: str):
+        """
+        Cancel a job. Queued jobs are dropped, running jobs have their task cancelled
+        so the browser / agent run is torn down. Returns the job or None.
+        """
+        job = self.jobs.get(job_id)
+        if not job:
+            return self.get(job_id)
+        if job.finished:
+            return job
+
+        if job.status == QUEUED:
+            # The worker will skip it when it comes off the queue
+            self._finish(job, CANCELLED, progress="Cancelled")
+            return job
+
+        if job.task:
+            job.task.cancel()
+
+        # Let the worker record the outcome before we report back
+        while not job.finished:
+            await job.wait_for_update(job.version)
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job and job.status == QUEUED:
+                    await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"❌ Worker {index} crashed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.update(status=RUNNING, progress="Starting", started_at=time.time())
+        log.info(f"🏃 Running {job.kind} job {job.id}")
+
+        job.task = asyncio.create_task(self.runners[job.kind](job))
+
+        # asyncio.wait doesn't forward our own cancellation into the job, so a
+        # cancelled job and a cancelled worker can be told apart
+        try:
+            await asyncio.wait({job.task})
+        except asyncio.CancelledError:
+            job.task.cancel()
+            raise
+
+        try:
+            result = job.task.result()
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED, progress="Cancelled")
+            log.info(f"🛑 Job {job.id} cancelled")
+            return
+        except Exception as e:
+            self._finish(job, FAILED, progress="Failed", error=str(e))
+            log.warning(f"⚠️  Job {job.id} failed: {e}")
+            return
+
+        if result:
+            self._finish(job, SUCCEEDED, progress="Done", result=result)
+        else:
+            self._finish(job, FAILED, progress="Done", error="No listings found.")
+        log.info(f"✅ Job {job.id} finished with status {job.status}")
+
+    def _finish(self, job: Job, status: str, **fields):
+        job.task = None
+        job.update(status=status, finished_at=time.time(), **fields)
+        try:
+            with open(self._result_path(job.id), "w", encoding="utf-8") as f:
+                json.dump(job.to_dict(), f)
+        except OSError as e:
+            log.warning(f"⚠️  Could not persist job {job.id}: {e}")
+
+    def _result_path(self, job_id: str):
+        # Job ids are hex uuids, never let anything else reach the filesystem
+        return os.path.join(self.results_dir, f"{uuid.UUID(hex=job_id).hex}.json")
+
+    def purge_expired(self):
+        """Forget finished jobs (in memory and on disk) older than the TTL."""
+        cutoff = time.time() - self.result_ttl
+
+        for job_id, job in list(self.jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self.jobs[job_id]
+
+        for name in os.listdir(self.results_dir):
+            path = os.path.join(self.results_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(min(self.result_ttl, 60))
+            self.purge_expired()
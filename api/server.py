@@ -1,8 +1,17 @@
+import os
+import json
+import asyncio
 import uvicorn
 from fastapi import FastAPI, Query
+from fastapi.responses import StreamingResponse
 from ai.mcp_client import run_redfin_scraper, get_mcp_server, shutdown_mcp
 from ai.utils import extract_locations
+from api.jobs import JobManager, QueueFullError, PRIORITIES
+from core.exporter import ListingExporter
+from core.geo import GeoIndex, OfflineGeocoder
+from core.parser import exceeds_price, parse_number
 from core.scraper import scrape_redfin, get_starting_url
+from core.traffic import governor
 from contextlib import asynccontextmanager
 from dotenv import dotenv_values
 
@@ -11,13 +20,113 @@ import logging
 
 log = logging.getLogger(__name__)
 
+# Every listing we scrape is kept here so geo queries don't need a new scrape
+LISTINGS_STORE = "listings.ndjson"
+# Optional `key,latitude,longitude` table (addresses or ZIPs) for listings without coordinates
+GEOCODE_TABLE = "geocode.csv"
+
+listing_index = GeoIndex()
+geocoder = None
+store_lock = asyncio.Lock()
+stored_rows = 0  # Rows in LISTINGS_STORE, including older copies of re-scraped listings
+
+
+def write_store(listings, append: bool = True):
+    """Append listings to the store, or replace the whole store with them."""
+    path = LISTINGS_STORE if append else LISTINGS_STORE + ".tmp"
+    with ListingExporter(path, "ndjson", append=append) as exporter:
+        exporter.write_many(listings)
+    if not append:
+        os.replace(path, LISTINGS_STORE)
+
+
+async def compact_store():
+    """Rewrite the store from the index, keeping one row per listing."""
+    global stored_rows
+    listings = listing_index.listings()
+    await asyncio.to_thread(write_store, listings, append=False)
+    log.info(f"🧹 Compacted {LISTINGS_STORE} from {stored_rows} to {len(listings)} rows")
+    stored_rows = len(listings)
+
+
+async def store_listings(listings):
+    """Geocode, index and save scraped listings for the /listings queries."""
+    global stored_rows
+    if not listings:
+        return
+
+    if geocoder:
+        for listing in listings:
+            geocoder.enrich(listing)
+    indexed = [listing for listing in listings if listing_index.add(listing)]
+    log.info(f"🗺️  Indexed {len(indexed)} of {len(listings)} listings with coordinates")
+
+    # Re-scraped listings are appended again, so rewrite the store once most rows are stale
+    try:
+        async with store_lock:
+            if stored_rows + len(indexed) > 2 * len(listing_index):
+                await compact_store()
+            elif indexed:
+                await asyncio.to_thread(write_store, indexed)
+                stored_rows += len(indexed)
+    except OSError as e:
+        log.warning(f"⚠️  Could not save listings: {e}")
+
+
+async def run_search_job(job):
+    """Job runner for a plain location / max price scrape."""
+    job.update(progress="Scraping Redfin")
+    listings = await scrape_redfin(job.params["location"], job.params["max_price"])
+    await store_listings(listings)
+    return listings
+
+
+async def run_ai_search_job(job):
+    """Job runner for a natural language goal scraped with the AI navigator."""
+    goal = job.params["goal"]
+
+    location = extract_locations(goal)
+    if not location:
+        raise ValueError(
+            "Could not extract location from the goal. Please specify a valid location."
+        )
+
+    job.update(progress=f"Getting starting URL for {location[0]}")
+    start_url = await get_starting_url(location[0])
+    if not start_url:
+        raise RuntimeError("Failed to get starting URL.")
+
+    job.update(progress="Applying filters with AI")
+    listings = await run_redfin_scraper(goal, start_url)
+    await store_listings(listings)
+    return listings
+
+
+jobs = JobManager(
+    runners={"search": run_search_job, "ai_search": run_ai_search_job},
+    max_workers=2,
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global geocoder, stored_rows
+
     # On start up
+    if os.path.exists(GEOCODE_TABLE):
+        geocoder = OfflineGeocoder(GEOCODE_TABLE)
+    stored_rows = await asyncio.to_thread(listing_index.load_ndjson, LISTINGS_STORE)
+    log.info(f"🗺️  Loaded {len(listing_index)} stored listings")
+    if stored_rows > len(listing_index):
+        try:
+            await compact_store()
+        except OSError as e:
+            log.warning(f"⚠️  Could not compact {LISTINGS_STORE}: {e}")
     await get_mcp_server()
+    await jobs.start()
     yield
     # On exit
+    await jobs.stop()
     await shutdown_mcp()
 
 
@@ -61,6 +170,7 @@ async def run_task_endpoint(
 
     # We run the LLM and wait for to finish
     listings = await run_redfin_scraper(goal, start_url)
+    await store_listings(listings)
 
     # If listings were found, return success and the properties. Else give an error
     if listings:
@@ -79,6 +189,7 @@ async def search_redfin(
 ):
     # Wait for manual scraping of site
     listings = await scrape_redfin(location, max_price)
+    await store_listings(listings)
 
     # If listings were found, return success and the properties. Else give an error
     if listings:
@@ -87,6 +198,162 @@ async def search_redfin(
         return {"status": "error", "message": "No listings found."}
 
 
+def submit_job(kind: str, params: dict, priority: str):
+    try:
+        job = jobs.submit(kind, params, priority)
+    except (QueueFullError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "queued", "job_id": job.id}
+
+
+@app.post("/jobs/search_redfin")
+async def submit_search_job(
+    location: str = Query(..., description="Location to scrape properties"),
+    max_price: int = Query(
+        None,
+        description="Max price that the properties can have (leave blank for unlimited)",
+    ),
+    priority: str = Query("normal", description=f"One of: {', '.join(PRIORITIES)}"),
+):
+    # Queue a manual scrape and return its job id straight away
+    return submit_job(
+        "search", {"location": location, "max_price": max_price}, priority
+    )
+
+
+@app.post("/jobs/search_redfin_with_ai")
+async def submit_ai_search_job(
+    goal: str = Query(
+        ...,
+        description="Natural language goal, e.g. 'Find rent under 3000 in Los Angeles'",
+    ),
+    priority: str = Query("normal", description=f"One of: {', '.join(PRIORITIES)}"),
+):
+    # Check if the OPENAI_API_KEY is specified before queueing anything
+    if not dotenv_values(".env")["OPENAI_API_KEY"]:
+        return {
+            "status": "error",
+            "message": "Could not find OPENAI_API_KEY in .env",
+        }
+
+    return submit_job("ai_search", {"goal": goal}, priority)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    # Poll a job for its status, progress and (once finished) its listings
+    job = jobs.get(job_id)
+    if not job:
+        return {"status": "error", "message": "Job not found or expired."}
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    # Server-sent events with every status / progress change until the job finishes
+    job = jobs.get(job_id)
+    if not job:
+        return {"status": "error", "message": "Job not found or expired."}
+
+    async def events():
+        version = None
+        while True:
+            if job.version != version:
+                version = job.version
+                data = job.to_dict(include_result=job.finished)
+                yield f"data: {json.dumps(data)}\n\n"
+            if job.finished:
+                return
+            # Wake up regularly so proxies don't drop an idle connection
+            await job.wait_for_update(version, timeout=15)
+            if job.version == version:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    # Cancel a queued or running job, closing its browser / agent run
+    job = await jobs.cancel(job_id)
+    if not job:
+        return {"status": "error", "message": "Job not found or expired."}
+    return job.to_dict(include_result=False)
+
+
+def matches_filters(listing: dict, min_beds: float | None, max_price: int | None):
+    if exceeds_price(listing["price"], max_price):
+        return False
+    if min_beds is not None:
+        beds = parse_number(listing["beds"])
+        return beds is not None and beds >= min_beds
+    return True
+
+
+def geo_response(results):
+    """Format (distance, listing) pairs like the search endpoints do."""
+    properties = [
+        {**listing, "distance_miles": round(distance, 2)} for distance, listing in results
+    ]
+    return {"status": "success", "count": len(properties), "properties": properties}
+
+
+@app.get("/listings/radius")
+async def listings_within_radius(
+    lat: float = Query(..., description="Latitude of the center point"),
+    lon: float = Query(..., description="Longitude of the center point"),
+    miles: float = Query(3, description="Radius in miles"),
+    min_beds: float = Query(None, description="Minimum number of beds"),
+    max_price: int = Query(None, description="Max price of the properties"),
+):
+    # Stored listings within the radius, closest first
+    results = [
+        (distance, listing)
+        for distance, listing in listing_index.radius(lat, lon, miles)
+        if matches_filters(listing, min_beds, max_price)
+    ]
+    return geo_response(results)
+
+
+@app.get("/listings/bbox")
+async def listings_in_bbox(
+    min_lat: float = Query(..., description="South edge of the box"),
+    min_lon: float = Query(..., description="West edge of the box"),
+    max_lat: float = Query(..., description="North edge of the box"),
+    max_lon: float = Query(..., description="East edge of the box"),
+    min_beds: float = Query(None, description="Minimum number of beds"),
+    max_price: int = Query(None, description="Max price of the properties"),
+):
+    # Stored listings inside the bounding box
+    properties = [
+        listing
+        for listing in listing_index.bbox(min_lat, min_lon, max_lat, max_lon)
+        if matches_filters(listing, min_beds, max_price)
+    ]
+    return {"status": "success", "count": len(properties), "properties": properties}
+
+
+@app.get("/listings/nearest")
+async def nearest_listings(
+    lat: float = Query(..., description="Latitude of the point"),
+    lon: float = Query(..., description="Longitude of the point"),
+    k: int = Query(10, description="Number of listings to return"),
+    min_beds: float = Query(None, description="Minimum number of beds"),
+    max_price: int = Query(None, description="Max price of the properties"),
+):
+    # The k stored listings closest to the point
+    results = listing_index.nearest(
+        lat, lon, k, lambda listing: matches_filters(listing, min_beds, max_price)
+    )
+    return geo_response(results)
+
+
+@app.get("/traffic_metrics")
+async def traffic_metrics():
+    # Rate limit, retry and circuit breaker stats per host
+    return {"status": "success", "hosts": governor.snapshot()}
+
+
 def main():
     # Run app on port 8080
     uvicorn.run(app, host="127.0.0.1", port=8080)
@@ -0,0 +1,253 @@
+import re
+import json
+
+# Get centralized logger
+import logging
+
+log = logging.getLogger(__name__)
+
+
+LD_JSON_RE = re.compile(
+    r"<script[^>]*type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>",
+    re.IGNORECASE | re.DOTALL,
+)
+SERVER_STATE_RE = re.compile(r"__reactServerState\.InitialContext\s*=\s*")
+HOME_ID_RE = re.compile(r"/home/(\d+)")
+
+# Redfin prefixes its API payloads with this to stop them being run as JS
+API_PREFIX = "{}&&"
+
+RESIDENCE_TYPES = (
+    "SingleFamilyResidence",
+    "Residence",
+    "House",
+    "Apartment",
+    "ApartmentComplex",
+    "Accommodation",
+    "Place",
+)
+
+
+def parse_embedded_listings(html_content: str):
+    """
+    Extract listings from the JSON Redfin embeds in its results pages (the
+    server state with the search API responses and the schema.org JSON-LD),
+    which is much cheaper than walking the rendered cards and carries more
+    fields: coordinates, listing id and number of available units.
+
+    JSON-LD alone has no price, so those listings come back with price "N/A".
+    Returns an empty list when the page has no usable payload.
+    """
+    listings = {}
+
+    for payload in _iter_payloads(html_content):
+        for obj in _walk(payload):
+            listing = _from_rental(obj) or _from_home(obj) or _from_ld_json(obj)
+            if not listing or listing["address"] == "N/A":
+                continue
+
+            # Same home shows up in several payloads, fill in whatever the first one lacked
+            key = listing["link"] if listing["link"] != "N/A" else listing["listing_id"]
+            if key in listings:
+                existing = listings[key]
+                for field, value in listing.items():
+                    if existing[field] == "N/A":
+                        existing[field] = value
+            else:
+                listings[key] = listing
+
+    return list(listings.values())
+
+
+def _iter_payloads(html_content: str):
+    """Yield every JSON document embedded in the page."""
+
+    # Server state assigned in an inline script, raw_decode stops at the end of the object
+    decoder = json.JSONDecoder()
+    for match in SERVER_STATE_RE.finditer(html_content):
+        try:
+            state, _ = decoder.raw_decode(html_content, match.end())
+        except json.JSONDecodeError as e:
+            log.debug(f"Could not decode embedded server state: {e}")
+            continue
+        yield state
+
+    for match in LD_JSON_RE.finditer(html_content):
+        try:
+            yield json.loads(match.group(1))
+        except json.JSONDecodeError:
+            continue
+
+
+def _walk(obj):
+    """Yield every dict inside a JSON document, unpacking nested API payloads."""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+        elif isinstance(item, str) and item.startswith(API_PREFIX):
+            try:
+                stack.append(json.loads(item[len(API_PREFIX) :]))
+            except json.JSONDecodeError:
+                pass
+
+
+def _value(obj, key):
+    """Redfin wraps many fields as {"value": ...}, unwrap them."""
+    value = obj.get(key) if isinstance(obj, dict) else None
+    if isinstance(value, dict) and "value" in value:
+        return value["value"]
+    return value
+
+
+def _format_range(low, high, fmt):
+    if low is None and high is None:
+        return "N/A"
+    if low is None or high is None or low == high:
+        return fmt(low if low is not None else high)
+    return f"{fmt(low)}–{fmt(high)}"
+
+
+def _money(value):
+    return f"${value:,.0f}"
+
+
+def _count(value):
+    return f"{value:g}"
+
+
+def _beds(low, high=None):
+    if low == 0 and not high:
+        return "Studio"
+    text = _format_range(low, high, _count)
+    return "N/A" if text == "N/A" else f"{text} {'bed' if text == '1' else 'beds'}"
+
+
+def _baths(low, high=None):
+    text = _format_range(low, high, _count)
+    return "N/A" if text == "N/A" else f"{text} {'bath' if text == '1' else 'baths'}"
+
+
+def _address(street, city, state, zip_code):
+    """Same format as the cards: "100 Pine St, Seattle, WA 98101"."""
+    region = " ".join(str(part) for part in (state, zip_code) if part)
+    return ", ".join(str(part) for part in (street, city, region) if part) or "N/A"
+
+
+def _link(url):
+    if not url:
+        return "N/A"
+    return url if url.startswith("http") else "https://www.redfin.com" + url
+
+
+def _listing_id(*candidates):
+    for candidate in candidates:
+        if candidate:
+            return str(candidate)
+    return "N/A"
+
+
+def _range(obj, key):
+    value = obj.get(key) or {}
+    return value.get("min"), value.get("max")
+
+
+def _from_rental(obj):
+    """Rental search API result: {"homeData": {...}, "rentalExtension": {...}}."""
+    home = obj.get("homeData")
+    rental = obj.get("rentalExtension")
+    if not isinstance(home, dict) or not isinstance(rental, dict):
+        return None
+
+    address_info = home.get("addressInfo") or {}
+    centroid = (address_info.get("centroid") or {}).get("centroid") or {}
+    address = _address(
+        address_info.get("formattedStreetLine"),
+        address_info.get("city"),
+        address_info.get("state"),
+        address_info.get("zip"),
+    )
+    price = _format_range(*_range(rental, "rentPriceRange"), _money)
+    url = home.get("url")
+
+    return {
+        "address": address,
+        "price": price if price == "N/A" else f"{price}/mo",
+        "beds": _beds(*_range(rental, "bedRange")),
+        "baths": _baths(*_range(rental, "bathRange")),
+        "sqft": _format_range(*_range(rental, "sqftRange"), lambda v: f"{v:,.0f}"),
+        "link": _link(url),
+        "latitude": centroid.get("latitude", "N/A"),
+        "longitude": centroid.get("longitude", "N/A"),
+        "listing_id": _listing_id(rental.get("rentalId"), home.get("propertyId")),
+        "units": rental.get("numAvailableUnits", "N/A"),
+    }
+
+
+def _from_home(obj):
+    """Home from the map / GIS search API: flat fields, many wrapped in {"value": ...}."""
+    lat_long = _value(obj, "latLong")
+    if not isinstance(lat_long, dict) or "price" not in obj:
+        return None
+
+    address = _address(
+        _value(obj, "streetLine"),
+        obj.get("city"),
+        obj.get("state"),
+        _value(obj, "zip") or _value(obj, "postalCode"),
+    )
+    price = _value(obj, "price")
+    sqft = _value(obj, "sqFt")
+    beds = obj.get("beds")
+    baths = obj.get("baths")
+
+    return {
+        "address": address,
+        "price": f"{_money(price)}/mo" if isinstance(price, (int, float)) else "N/A",
+        "beds": _beds(beds) if isinstance(beds, (int, float)) else "N/A",
+        "baths": _baths(baths) if isinstance(baths, (int, float)) else "N/A",
+        "sqft": f"{sqft:,.0f}" if isinstance(sqft, (int, float)) else "N/A",
+        "link": _link(obj.get("url")),
+        "latitude": lat_long.get("latitude", "N/A"),
+        "longitude": lat_long.get("longitude", "N/A"),
+        "listing_id": _listing_id(obj.get("listingId"), obj.get("propertyId")),
+        "units": "N/A",
+    }
+
+
+def _from_ld_json(obj):
+    """schema.org residence from JSON-LD, no price or beds but it does have geo."""
+    types = obj.get("@type")
+    types = types if isinstance(types, list) else [types]
+    address = obj.get("address")
+    if not any(t in RESIDENCE_TYPES for t in types) or not isinstance(address, dict):
+        return None
+
+    geo = obj.get("geo") or {}
+    floor_size = obj.get("floorSize") or {}
+    url = obj.get("url")
+    match = HOME_ID_RE.search(url or "")
+
+    return {
+        "address": _address(
+            address.get("streetAddress"),
+            address.get("addressLocality"),
+            address.get("addressRegion"),
+            address.get("postalCode"),
+        ),
+        "price": "N/A",
+        "beds": "N/A",
+        "baths": "N/A",
+        "sqft": f"{floor_size['value']:,.0f}"
+        if isinstance(floor_size.get("value"), (int, float))
+        else "N/A",
+        "link": _link(url),
+        "latitude": geo.get("latitude", "N/A"),
+        "longitude": geo.get("longitude", "N/A"),
+        "listing_id": match.group(1) if match else "N/A",
+        "units": "N/A",
+    }
@@ -0,0 +1,292 @@
+import os
+import csv
+import gzip
+import json
+import time
+import uuid
+from core.parser import parse_coordinate, parse_number, parse_int
+
+# Get centralized logger
+import logging
+
+log = logging.getLogger(__name__)
+
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+# Compression each format supports, the first Parquet codec is the default
+COMPRESSIONS = {
+    "csv": ("gzip",),
+    "ndjson": ("gzip",),
+    "parquet": ("snappy", "gzip", "zstd", "brotli", "lz4", "none"),
+}
+
+# Columns written to Parquet and how to turn the scraped text into a typed value
+COLUMNS = {
+    "address": ("string", str),
+    "price": ("int64", parse_int),
+    "beds": ("float64", parse_number),
+    "baths": ("float64", parse_number),
+    "sqft": ("int64", parse_int),
+    "link": ("string", str),
+    "latitude": ("float64", parse_coordinate),
+    "longitude": ("float64", parse_coordinate),
+    "listing_id": ("string", str),
+    "units": ("int64", parse_int),
+}
+
+
+def detect_format(path: str):
+    """Guess the export format from the file extension (default: csv)."""
+    name = path.lower().removesuffix(".gz")
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if name.endswith((".parquet", ".pq")) or os.path.isdir(path):
+        return "parquet"
+    return "csv"
+
+
+def check_options(path: str, fmt: str | None = None, compression: str | None = None):
+    """
+    Check an export can be written before doing any work for it. Returns the
+    format, raises ValueError for a bad format / compression and ImportError
+    when Parquet is asked for without pyarrow.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(
+            f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})"
+        )
+    if compression is not None and compression not in COMPRESSIONS[fmt]:
+        raise ValueError(
+            f"{fmt} export supports {', '.join(COMPRESSIONS[fmt])} compression, not {compression}"
+        )
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "Parquet export needs pyarrow, install it with: pip install pyarrow"
+            )
+    return fmt
+
+
+def to_typed_record(listing: dict):
+    """Convert a scraped listing into typed column values ("N/A" becomes None)."""
+    record = {}
+    for name, (_, convert) in COLUMNS.items():
+        value = listing.get(name)
+        record[name] = None if value in (None, "N/A") else convert(value)
+    return record
+
+
+class CsvExporter:
+    """
+    Write listings to CSV one row at a time. When appending to an existing file
+    its header is reused so batch runs line up.
+    """
+
+    def __init__(self, path: str, compression: str | None = None, append: bool = False):
+        self.path = path
+        self.count = 0
+        self.fieldnames = None
+        self._writer = None
+
+        gzipped = compression == "gzip" or path.endswith(".gz")
+        opener = gzip.open if gzipped else open
+
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with opener(path, "rt", newline="", encoding="utf-8") as f:
+                self.fieldnames = next(csv.reader(f), None)
+
+        mode = "at" if append else "wt"
+        self._file = opener(path, mode, newline="", encoding="utf-8")
+
+    def write(self, listing: dict):
+        if self._writer is None:
+            header_needed = self.fieldnames is None
+            self.fieldnames = self.fieldnames or list(listing.keys())
+            self._writer = csv.DictWriter(
+                self._file, fieldnames=self.fieldnames, extrasaction="ignore"
+            )
+            if header_needed:
+                self._writer.writeheader()
+
+        self._writer.writerow(listing)
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class NdjsonExporter:
+    """Write listings as newline-delimited JSON, one object per line."""
+
+    def __init__(self, path: str, compression: str | None = None, append: bool = False):
+        self.path = path
+        self.count = 0
+
+        gzipped = compression == "gzip" or path.endswith(".gz")
+        opener = gzip.open if gzipped else open
+        self._file = opener(path, "at" if append else "wt", encoding="utf-8")
+
+    def write(self, listing: dict):
+        self._file.write(json.dumps(listing, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetExporter:
+    """
+    Write listings to Parquet with typed numeric columns, in row groups of
+    `batch_size`. Needs pyarrow.
+
+    Parquet files can't be appended to, so in append mode `path` is treated as a
+    dataset directory and every run adds a new part file to it. If `path` is
+    already a single Parquet file, the part file is written next to it instead.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        compression: str | None = None,
+        append: bool = False,
+        batch_size: int = 10_000,
+    ):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(
+                "Parquet export needs pyarrow, install it with: pip install pyarrow"
+            )
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [(name, getattr(pa, type_name)()) for name, (type_name, _) in COLUMNS.items()]
+        )
+
+        part = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        if append and os.path.isfile(path):
+            stem = path.removesuffix(".parquet").removesuffix(".pq")
+            log.info(f"📎 {path} is a single Parquet file, adding {stem}-{part} next to it")
+            path = f"{stem}-{part}"
+        elif append or os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, part)
+
+        self.path = path
+        self.count = 0
+        self.batch_size = batch_size
+        self._rows = []
+        try:
+            self._writer = pq.ParquetWriter(
+                path, self.schema, compression=compression or "snappy"
+            )
+        except pa.ArrowException as e:
+            # pyarrow creates the file before it checks the options
+            if os.path.exists(path):
+                os.remove(path)
+            raise ValueError(f"Could not write Parquet: {e}") from e
+
+    def write(self, listing: dict):
+        self._rows.append(to_typed_record(listing))
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            try:
+                table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+                self._writer.write_table(table)
+            except self._pa.ArrowException as e:
+                raise ValueError(f"Could not write Parquet: {e}") from e
+            self._rows = []
+
+    def close(self):
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+
+
+EXPORTERS = {"csv": CsvExporter, "ndjson": NdjsonExporter, "parquet": ParquetExporter}
+
+
+class ListingExporter:
+    """
+    Incrementally write listings to CSV, NDJSON or Parquet.
+
+    Use as a context manager and call write() as listings come in:
+
+        with ListingExporter("listings.parquet") as exporter:
+            for listing in listings:
+                exporter.write(listing)
+
+    Args:
+        path: Output file (or dataset directory when appending Parquet)
+        fmt: One of FORMATS, guessed from the extension when left out
+        compression: "gzip" for CSV / NDJSON, one of COMPRESSIONS["parquet"] for
+            Parquet (snappy by default). ".gz" paths are always gzipped.
+        append: Add to an existing export instead of overwriting it
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fmt: str | None = None,
+        compression: str | None = None,
+        append: bool = False,
+    ):
+        fmt = check_options(path, fmt, compression)
+
+        self.format = fmt
+        self._exporter = EXPORTERS[fmt](path, compression=compression, append=append)
+
+        # Parquet always writes a new file, CSV / NDJSON only when not appending
+        self._new_file = fmt == "parquet" or not append
+
+    @property
+    def path(self):
+        return self._exporter.path
+
+    @property
+    def count(self):
+        return self._exporter.count
+
+    def write(self, listing: dict):
+        self._exporter.write(listing)
+
+    def write_many(self, listings):
+        for listing in listings:
+            self._exporter.write(listing)
+
+    def close(self):
+        self._exporter.close()
+        log.debug(f"💾 Wrote {self.count} listings to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def abort(self):
+        """Stop after a failed write, removing the file if this export created it."""
+        try:
+            self._exporter.close()
+        except Exception as e:
+            log.debug(f"Could not close {self.path} after a failed export: {e}")
+        if self._new_file and os.path.isfile(self.path):
+            os.remove(self.path)
+            log.debug(f"🗑️  Removed partial export {self.path}")
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+            return
+        try:
+            self.close()
+        except Exception:
+            self.abort()
+            raise
@@ -0,0 +1,263 @@
+import os
+import re
+import csv
+import json
+import math
+import heapq
+from core.parser import parse_coordinate
+
+# Get centralized logger
+import logging
+
+log = logging.getLogger(__name__)
+
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+ZIP_RE = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float):
+    """Great-circle distance between two points in miles."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def listing_coordinates(listing: dict):
+    """Return (latitude, longitude) of a listing, or None if it has no usable ones."""
+    lat = parse_coordinate(listing.get("latitude"))
+    lon = parse_coordinate(listing.get("longitude"))
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def listing_key(listing: dict):
+    """Identify a listing across scrapes, so re-scraping updates it instead of duplicating it."""
+    if listing.get("link", "N/A") != "N/A":
+        return listing["link"]
+    if listing.get("listing_id", "N/A") != "N/A":
+        return listing["listing_id"]
+    return listing.get("address")
+
+
+def normalize_address(address: str):
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", address.lower()).split())
+
+
+class OfflineGeocoder:
+    """
+    Look up coordinates for listings without any, from a local CSV table with
+    columns `key,latitude,longitude`. A key is either a full address or a ZIP
+    code, so a table of ZIP centroids is enough for rough placement.
+    """
+
+    def __init__(self, path: str):
+        self.table = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    coords = float(row["latitude"]), float(row["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.table[normalize_address(row.get("key") or "")] = coords
+        log.info(f"🗺️  Loaded {len(self.table)} geocoding entries from {path}")
+
+    def geocode(self, address: str):
+        """Return (latitude, longitude) for the address, or None."""
+        if not address or address == "N/A":
+            return None
+
+        coords = self.table.get(normalize_address(address))
+        if coords:
+            return coords
+
+        match = ZIP_RE.search(address)
+        return self.table.get(match.group(1)) if match else None
+
+    def enrich(self, listing: dict):
+        """Fill in a listing's latitude / longitude if it has none."""
+        if listing_coordinates(listing):
+            return listing
+        coords = self.geocode(listing.get("address"))
+        if coords:
+            listing["latitude"], listing["longitude"] = coords
+        return listing
+
+
+class GeoIndex:
+    """
+    In-memory grid index over listings for radius, bounding box and nearest-k
+    queries. Listings are bucketed into `cell_degrees` squares, so a query only
+    looks at the cells it overlaps instead of every listing.
+    """
+
+    def __init__(self, cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        self.cells: dict[tuple[int, int], dict] = {}
+        self.entries: dict[str, tuple] = {}  # key -> (cell, lat, lon, listing)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def listings(self):
+        """Every indexed listing, one per key."""
+        return [listing for _, _, _, listing in self.entries.values()]
+
+    def _cell(self, lat: float, lon: float):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, listing: dict):
+        """Add or update a listing. Returns False if it has no coordinates."""
+        coords = listing_coordinates(listing)
+        if coords is None:
+            return False
+
+        key = listing_key(listing)
+        self.remove(key)
+
+        lat, lon = coords
+        cell = self._cell(lat, lon)
+        self.cells.setdefault(cell, {})[key] = (lat, lon, listing)
+        self.entries[key] = (cell, lat, lon, listing)
+        return True
+
+    def add_many(self, listings):
+        """Add listings, returning how many had coordinates."""
+        return sum(self.add(listing) for listing in listings)
+
+    def remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        cell = entry[0]
+        del self.cells[cell][key]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def _iter_cells(self, min_lat, min_lon, max_lat, max_lon):
+        (min_row, min_col), (max_row, max_col) = (
+            self._cell(min_lat, min_lon),
+            self._cell(max_lat, max_lon),
+        )
+
+        # A huge box is cheaper to answer by going over the occupied cells
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self.cells):
+            for (row, col), bucket in self.cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    yield bucket
+            return
+
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                bucket = self.cells.get((row, col))
+                if bucket:
+                    yield bucket
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+        """Listings inside the bounding box."""
+        return [
+            listing
+            for bucket in self._iter_cells(min_lat, min_lon, max_lat, max_lon)
+            for lat, lon, listing in bucket.values()
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+        ]
+
+    def radius(self, lat: float, lon: float, miles: float):
+        """(distance in miles, listing) pairs within `miles` of the point, closest first."""
+        dlat = miles / MILES_PER_DEGREE_LAT
+        dlon = miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+
+        results = []
+        for bucket in self._iter_cells(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            for item_lat, item_lon, listing in bucket.values():
+                distance = haversine_miles(lat, lon, item_lat, item_lon)
+                if distance <= miles:
+                    results.append((distance, listing))
+
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def nearest(self, lat: float, lon: float, k: int, predicate=None):
+        """
+        The k (distance in miles, listing) pairs closest to the point, closest first.
+        Searches rings of cells outwards and stops once no unvisited cell can be closer.
+        """
+        if k <= 0 or not self.cells:
+            return []
+
+        center_row, center_col = self._cell(lat, lon)
+        rows = [row for row, _ in self.cells]
+        cols = [col for _, col in self.cells]
+        max_ring = max(
+            abs(center_row - min(rows)),
+            abs(center_row - max(rows)),
+            abs(center_col - min(cols)),
+            abs(center_col - max(cols)),
+        )
+
+        # Smallest distance across one cell, so ring r is at least (r - 1) cells away
+        cell_miles = (
+            self.cell_degrees
+            * MILES_PER_DEGREE_LAT
+            * min(1.0, max(math.cos(math.radians(abs(lat) + self.cell_degrees)), 1e-6))
+        )
+
+        # Far from everything indexed, going over every listing is cheaper than the rings
+        if (2 * max_ring + 1) ** 2 > 4 * len(self.cells):
+            candidates = (
+                (haversine_miles(lat, lon, item_lat, item_lon), listing)
+                for _, item_lat, item_lon, listing in self.entries.values()
+                if not predicate or predicate(listing)
+            )
+            return heapq.nsmallest(k, candidates, key=lambda result: result[0])
+
+        best = []  # max-heap of (-distance, tiebreak, listing)
+        for ring in range(max_ring + 1):
+            if len(best) == k and (ring - 1) * cell_miles > -best[0][0]:
+                break
+
+            for cell in self._ring_cells(center_row, center_col, ring):
+                for item_lat, item_lon, listing in self.cells.get(cell, {}).values():
+                    if predicate and not predicate(listing):
+                        continue
+                    distance = haversine_miles(lat, lon, item_lat, item_lon)
+                    entry = (-distance, id(listing), listing)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, entry)
+
+        return [(-distance, listing) for distance, _, listing in sorted(best, reverse=True)]
+
+    @staticmethod
+    def _ring_cells(center_row: int, center_col: int, ring: int):
+        """Cells exactly `ring` cells away from the center cell."""
+        if ring == 0:
+            yield center_row, center_col
+            return
+        for col in range(center_col - ring, center_col + ring + 1):
+            yield center_row - ring, col
+            yield center_row + ring, col
+        for row in range(center_row - ring + 1, center_row + ring):
+            yield row, center_col - ring
+            yield row, center_col + ring
+
+    def load_ndjson(self, path: str):
+        """Index listings saved as NDJSON (see core.exporter). Returns how many were added."""
+        if not os.path.exists(path):
+            return 0
+
+        added = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    added += self.add(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return added
@@ -1,4 +1,16 @@
+import re
+import html
 from bs4 import BeautifulSoup
+from core.embedded import parse_embedded_listings
+
+NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+# Extra fields only the embedded JSON has, "N/A" when a listing came from a card
+EMBEDDED_FIELDS = ("latitude", "longitude", "listing_id", "units")
+
+CARD_RE = re.compile(r"class=[\"'][^\"']*\bHomeCardContainer\b")
+CARD_LINK_RE = re.compile(r"<a\b[^>]*\bbp-Homecard__Address(?![\w-])[^>]*>")
+HREF_RE = re.compile(r"\bhref=[\"']([^\"']*)")
 
 
 def has_digit(s: str):
@@ -6,35 +18,114 @@ def has_digit(s: str):
     return any(d if d.isdigit() else False for d in str(s))
 
 
+def parse_number(text) -> float | None:
+    """
+    Get the first number out of a listing field, e.g. "$2,450/mo" -> 2450.0,
+    "1.5 baths" -> 1.5, "1-2 beds" -> 1.0. Studios count as 0 beds.
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+
+    match = NUMBER_RE.search(str(text))
+    if match:
+        return float(match.group().replace(",", ""))
+    if "studio" in str(text).lower():
+        return 0.0
+    return None
+
+
+def parse_coordinate(value) -> float | None:
+    """Latitude / longitude as a float, or None. Unlike parse_number it keeps the sign."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_int(text) -> int | None:
+    """Like parse_number but rounded to a whole number (prices, sqft)."""
+    number = parse_number(text)
+    return round(number) if number is not None else None
+
+
+def exceeds_price(price: str, max_price: int | None):
+    """Check if a listing's price is over max_price (unknown prices never are)."""
+    if not max_price or price == "N/A":
+        return False
+    int_price = parse_int(price)
+    return bool(int_price) and int_price > max_price
+
+
 def parse_redfin_property(html_content: str, max_price: int | None = None):
     """
     Extract property listings from a Redfin search results page.
     """
+    return list(iter_redfin_properties(html_content, max_price))
+
+
+def iter_redfin_properties(html_content: str, max_price: int | None = None):
+    """
+    Yield property listings from a Redfin search results page one at a time,
+    so they can be written out as they are parsed.
+
+    Listings come from the JSON embedded in the page when it has a priced listing
+    for every rendered card. The embedded JSON is from the first page load, so when
+    filters were applied in the page since then the cards no longer match it, and
+    they are parsed instead with the embedded data only adding coordinates.
+    """
+
+    embedded = parse_embedded_listings(html_content)
+    by_link = {listing["link"]: listing for listing in embedded}
+
+    links = card_links(html_content)
+    if (
+        links
+        and len(links) == len(CARD_RE.findall(html_content))
+        and all(by_link.get(link, {}).get("price", "N/A") != "N/A" for link in links)
+    ):
+        for link in links:
+            listing = by_link[link]
+            if not exceeds_price(listing["price"], max_price):
+                yield listing
+        return
+
+    for listing in iter_card_properties(html_content, max_price):
+        extra = by_link.get(listing["link"], {})
+        for field in EMBEDDED_FIELDS:
+            listing[field] = extra.get(field, "N/A")
+        yield listing
+
+
+def card_links(html_content: str):
+    """Links of the rendered home cards, in page order, without parsing the whole page."""
+    links = []
+    for tag in CARD_LINK_RE.findall(html_content):
+        match = HREF_RE.search(tag)
+        if match:
+            links.append("https://www.redfin.com" + html.unescape(match.group(1)))
+    return links
+
+
+def iter_card_properties(html_content: str, max_price: int | None = None):
+    """
+    Yield property listings parsed from the rendered home cards.
+    """
 
     soup = BeautifulSoup(html_content, "html.parser")
     cards = soup.select(
         "div.HomeCardContainer"
     )  # Get all the cards with the property details
 
-    properties = []
-
     for card in cards:
         # Price
         price_element = card.select_one("span.bp-Homecard__Price--value")
         price = price_element.get_text(strip=True) if price_element else "N/A"
 
         # Filter by max_price if provided
-        if max_price and price != "N/A":
-            # Only keep digits from price string and convert to int
-            int_price = (
-                int("".join(filter(str.isdigit, price)))
-                if any(ch.isdigit() for ch in price)
-                else None
-            )
-
-            # Skip if price exceeds max_price
-            if int_price & (int_price > max_price):
-                continue
+        if exceeds_price(price, max_price):
+            continue
 
         # Address
         address_div = card.select_one("div.bp-Homecard__Address--address")
@@ -81,6 +172,4 @@ def parse_redfin_property(html_content: str, max_price: int | None = None):
                 "link": link,
             }
 
-            properties.append(property_info)
-
-    return properties
+            yield property_info
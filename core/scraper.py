@@ -1,5 +1,8 @@
+import re
 from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from core.parser import parse_redfin_property
+from core.traffic import governor, BlockedError, TransientError
 from ai.utils import extract_locations
 
 # Get centralized logger
@@ -7,10 +10,90 @@ import logging
 
 log = logging.getLogger(__name__)
 
+REDFIN_HOST = "www.redfin.com"
 
-async def scrape_redfin(location: str, max_price: int | None = None):
+# Page titles of Redfin's bot-detection / rate limit pages
+BLOCK_TITLES = (
+    "access to this page has been denied",
+    "access denied",
+    "are you a robot",
+    "are you a human",
+    "request blocked",
+)
+
+# Captcha containers that never show up on a normal results page
+BLOCK_MARKERS = ('id="px-captcha"', "id='px-captcha'")
+
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+# Network errors that usually go away on their own
+TRANSIENT_NETWORK_ERRORS = (
+    "ERR_TIMED_OUT",
+    "ERR_CONNECTION_RESET",
+    "ERR_CONNECTION_CLOSED",
+    "ERR_NETWORK_CHANGED",
+    "ERR_EMPTY_RESPONSE",
+)
+
+
+def looks_blocked(html: str | None):
+    """Check if the page is a block page / captcha instead of real content."""
+    if not html:
+        return False
+
+    title = TITLE_RE.search(html)
+    if title and any(t in title.group(1).lower() for t in BLOCK_TITLES):
+        return True
+    return any(marker in html for marker in BLOCK_MARKERS)
+
+
+async def open_search_results(context, location: str):
     """
-    Scrape redfin for real estate listings in the given location.
+    Open a new page, search Redfin rentals for the location and wait for listings.
+    Raises BlockedError on block pages and TransientError on failures worth retrying.
+    """
+
+    page = await context.new_page()
+
+    try:
+        # Go to redfin homepage and wait for searchbar to load
+        await page.goto("https://www.redfin.com/", timeout=60000)
+        await page.wait_for_load_state("networkidle")
+        if looks_blocked(await page.content()):
+            raise BlockedError("Redfin served a block page on the homepage.")
+        await page.wait_for_selector("input#search-box-input", timeout=10000)
+
+        # Switch to "Rent" section
+        await page.locator('span[data-text="Rent"]').click()
+
+        # Search for the location
+        search_box_placeholder = "City, Address, School, Building, ZIP"
+        await page.wait_for_selector("input#search-box-input", timeout=10000)
+        await page.get_by_placeholder(search_box_placeholder).click(timeout=10000)
+        await page.get_by_placeholder(search_box_placeholder).fill(location)
+        await page.keyboard.press("Enter")
+        await page.wait_for_load_state("networkidle")
+
+        # Wait for the listings to load to ensure we are on the correct page
+        try:
+            await page.wait_for_selector("div.HomeCardContainer", timeout=20000)
+        except PlaywrightTimeoutError:
+            if looks_blocked(await page.content()):
+                raise BlockedError("Redfin served a block page instead of listings.")
+            raise TransientError("Listings (HomeCardContainer) never loaded.")
+
+        return page
+
+    except Exception as e:
+        await page.close()
+        if any(err in str(e) for err in TRANSIENT_NETWORK_ERRORS):
+            raise TransientError(str(e)) from e
+        raise
+
+
+async def fetch_redfin_html(location: str):
+    """
+    Open the Redfin rentals search results for the location and return the page HTML.
     """
     try:
         location = extract_locations(location)[0]
@@ -31,36 +114,20 @@ async def scrape_redfin(location: str, max_price: int | None = None):
             locale="en-US",
         )
 
-        page = await context.new_page()
-
-        properties = []
+        html_content = None
 
         try:
-            # Go to redfin homepage and wait for searchbar to load
-            await page.goto("https://www.redfin.com/", timeout=60000)
-            await page.wait_for_load_state("networkidle")
-            await page.wait_for_selector("input#search-box-input", timeout=10000)
-
-            # Switch to "Rent" section
-            await page.locator('span[data-text="Rent"]').click()
-
-            # Search for the location
-            search_box_placeholder = "City, Address, School, Building, ZIP"
-            await page.wait_for_selector("input#search-box-input", timeout=10000)
-            await page.get_by_placeholder(search_box_placeholder).click(timeout=10000)
-            await page.get_by_placeholder(search_box_placeholder).fill(location)
-            await page.keyboard.press("Enter")
-            await page.wait_for_load_state("networkidle")
+            # Search for the location, retrying through the traffic governor
+            page = await governor.run(
+                REDFIN_HOST,
+                lambda: open_search_results(context, location),
+                retry_on=(PlaywrightTimeoutError,),
+            )
 
             log.info(f"➡️  Navigated to search results page for {location}")
 
-            # Wait for the listings to load
-            await page.wait_for_selector("div.HomeCardContainer", timeout=20000)
-
             # Get HTML content of the page
             html_content = await page.content()
-            properties = parse_redfin_property(html_content, max_price)
-            log.info(f"✅ Scraped {len(properties)} properties from Redfin")
 
         except Exception as e:
             if "ERR_NAME_NOT_RESOLVED" in str(e):
@@ -75,7 +142,20 @@ async def scrape_redfin(location: str, max_price: int | None = None):
         finally:
             await browser.close()
 
-        return properties
+        return html_content
+
+
+async def scrape_redfin(location: str, max_price: int | None = None):
+    """
+    Scrape redfin for real estate listings in the given location.
+    """
+    html_content = await fetch_redfin_html(location)
+    if html_content is None:
+        return
+
+    properties = parse_redfin_property(html_content, max_price)
+    log.info(f"✅ Scraped {len(properties)} properties from Redfin")
+    return properties
 
 
 async def get_starting_url(location: str):
@@ -90,29 +170,15 @@ async def get_starting_url(location: str):
             locale="en-US",
         )
 
-        page = await context.new_page()
-
         url = ""
 
         try:
-            # Go to redfin homepage and wait for searchbar to load
-            await page.goto("https://www.redfin.com/", timeout=60000)
-            await page.wait_for_load_state("networkidle")
-            await page.wait_for_selector("input#search-box-input", timeout=10000)
-
-            # Switch to "Rent" section
-            await page.locator('span[data-text="Rent"]').click()
-
-            # Search for the location
-            search_box_placeholder = "City, Address, School, Building, ZIP"
-            await page.wait_for_selector("input#search-box-input", timeout=10000)
-            await page.get_by_placeholder(search_box_placeholder).click(timeout=10000)
-            await page.get_by_placeholder(search_box_placeholder).fill(location)
-            await page.keyboard.press("Enter")
-            await page.wait_for_load_state("networkidle")
-
-            # Wait for the listings to load to ensure we are on the correct page
-            await page.wait_for_selector("div.HomeCardContainer", timeout=20000)
+            # Search for the location, retrying through the traffic governor
+            page = await governor.run(
+                REDFIN_HOST,
+                lambda: open_search_results(context, location),
+                retry_on=(PlaywrightTimeoutError,),
+            )
 
             # Get the current URL
             url = page.url
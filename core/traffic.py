@@ -0,0 +1,267 @@
+import time
+import random
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+# Get centralized logger
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class TransientError(Exception):
+    """A failure worth retrying (timeouts, listings that never rendered, ...)."""
+
+
+class BlockedError(Exception):
+    """The site served a block page or captcha instead of results."""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while a host's circuit is open."""
+
+
+class TokenBucket:
+    """
+    Token bucket that refills `rate` tokens per second up to `capacity`.
+
+    The rate is adaptive: it is halved when the host pushes back and creeps
+    back up towards `max_rate` on every success.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait for a token and return how many seconds we waited."""
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= 1
+        return waited
+
+    def slow_down(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def speed_up(self):
+        self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive blocks and rejects requests for `cooldown`
+    seconds. After that a single trial request is let through (half open): success
+    closes the circuit again, another block re-opens it.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.blocks = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def release_trial(self):
+        """Let another trial through after one ended without a verdict."""
+        self.trial_running = False
+
+    def record_success(self):
+        self.blocks = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_block(self):
+        self.blocks += 1
+        self.trial_running = False
+        if self.blocks >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class TrafficGovernor:
+    """
+    Shared per-host traffic control: token-bucket rate limiting, retries with
+    exponential backoff and jitter, and a circuit breaker for block pages.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.5,
+        burst: int = 2,
+        max_retries: int = 3,
+        base_delay: float = 2.0,
+        max_delay: float = 30.0,
+        breaker_threshold: int = 2,
+        breaker_cooldown: float = 300.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+        self.buckets: dict[str, TokenBucket] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.metrics: dict[str, dict] = defaultdict(
+            lambda: {
+                "requests": 0,
+                "successes": 0,
+                "retries": 0,
+                "transient_failures": 0,
+                "blocks": 0,
+                "circuit_rejections": 0,
+                "throttled_seconds": 0.0,
+            }
+        )
+
+    def _bucket(self, host: str):
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    def _breaker(self, host: str):
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_cooldown
+            )
+        return self.breakers[host]
+
+    async def acquire(self, host: str):
+        """
+        Check the circuit and wait for a rate limit token before talking to `host`.
+        Returns True if this request holds the half-open trial slot.
+        """
+        breaker = self._breaker(host)
+        trial = breaker.state == "half_open"
+        if not breaker.allow():
+            self.metrics[host]["circuit_rejections"] += 1
+            raise CircuitOpenError(
+                f"Too many block pages from {host}, pausing requests for a while."
+            )
+
+        self.metrics[host]["requests"] += 1
+        try:
+            waited = await self._bucket(host).acquire()
+        except BaseException:
+            if trial:
+                breaker.release_trial()
+            raise
+        self.metrics[host]["throttled_seconds"] += waited
+        return trial
+
+    @asynccontextmanager
+    async def attempt(self, host: str):
+        """
+        One request to `host`: waits for the circuit and a token, then records a
+        block if the body raises BlockedError and a success if it finishes. Any
+        other error (or cancellation) gives back the trial slot if we held it.
+        """
+        trial = await self.acquire(host)
+        try:
+            yield
+        except BlockedError:
+            self.record_block(host)
+            raise
+        except BaseException:
+            if trial:
+                self.release(host)
+            raise
+        self.record_success(host)
+
+    def record_success(self, host: str):
+        self.metrics[host]["successes"] += 1
+        self._breaker(host).record_success()
+        self._bucket(host).speed_up()
+
+    def record_block(self, host: str):
+        self.metrics[host]["blocks"] += 1
+        self._breaker(host).record_block()
+        self._bucket(host).slow_down()
+        log.warning(f"🚧 Blocked by {host} (circuit {self._breaker(host).state})")
+
+    def release(self, host: str):
+        """Give back a half-open trial slot when a request ended without a verdict."""
+        self._breaker(host).release_trial()
+
+    def record_transient(self, host: str):
+        self.metrics[host]["transient_failures"] += 1
+        self._bucket(host).slow_down()
+
+    def backoff(self, attempt: int):
+        """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    async def run(self, host: str, fn, retry_on: tuple = ()):
+        """
+        Call the async function `fn` against `host` under the governor.
+
+        TransientError (and anything in `retry_on`) is retried with backoff,
+        BlockedError trips the circuit breaker and is raised straight away.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.attempt(host):
+                    return await fn()
+            except (TransientError, *retry_on) as e:
+                self.record_transient(host)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                self.metrics[host]["retries"] += 1
+                log.warning(
+                    f"🔁 Transient error from {host}, retry {attempt}/{self.max_retries} in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    def snapshot(self):
+        """Current metrics, rate and circuit state for every host we've talked to."""
+        return {
+            host: {
+                **metrics,
+                "throttled_seconds": round(metrics["throttled_seconds"], 2),
+                "rate_per_second": round(self._bucket(host).rate, 4),
+                "circuit": self._breaker(host).state,
+            }
+            for host, metrics in self.metrics.items()
+        }
+
+
+# Shared by every scraper in the process
+governor = TrafficGovernor()
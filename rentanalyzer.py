@@ -1,4 +1,5 @@
 import argparse
+import itertools
 from logging_setup import setup_logging
 import logging
 
@@ -15,7 +16,32 @@ parser.add_argument(
     "--output",
     type=str,
     default=None,
-    help="Output CSV file to save rental analysis results (default: will output to terminal)",
+    help="Output file to save rental analysis results, format is picked from the extension (.csv, .ndjson, .parquet, optionally .gz) (default: will output to terminal)",
+)
+
+parser.add_argument(
+    "-f",
+    "--format",
+    type=str,
+    choices=["csv", "ndjson", "parquet"],
+    default=None,
+    help="Output format, overrides the file extension (works in conjunction with -o)",
+)
+
+parser.add_argument(
+    "-c",
+    "--compression",
+    type=str,
+    choices=["gzip", "snappy", "zstd", "brotli", "lz4", "none"],
+    default=None,
+    help="Compress the output: gzip for CSV/NDJSON, snappy/gzip/zstd/brotli/lz4/none for Parquet (works in conjunction with -o)",
+)
+
+parser.add_argument(
+    "-a",
+    "--append",
+    action="store_true",
+    help="Append to an existing output instead of overwriting it, Parquet output becomes a dataset directory (works in conjunction with -o)",
 )
 
 parser.add_argument(
@@ -53,6 +79,60 @@ parser.add_argument(
 args = parser.parse_args()
 
 
+def check_output():
+    """Check the -o / -f / -c options before scraping, so a bad combination fails fast."""
+    if not args.output:
+        return True
+
+    from core.exporter import check_options
+
+    try:
+        check_options(args.output, args.format, args.compression)
+    except (ImportError, ValueError) as e:
+        log.error(f"❌ Can't save to {args.output}: {e}")
+        return False
+    return True
+
+
+def output_listings(listings):
+    """
+    Save listings to the -o file, or print them to the terminal. Listings can be
+    any iterable, rows are written as they come. Returns how many were output
+    (None if saving failed).
+    """
+    listings = iter(listings)
+
+    # Don't touch the output file unless there is something to write to it
+    first = next(listings, None)
+    if first is None:
+        return 0
+    listings = itertools.chain([first], listings)
+
+    # If user wants to save to a file
+    if args.output:
+        from core.exporter import ListingExporter
+
+        try:
+            with ListingExporter(
+                args.output, args.format, args.compression, args.append
+            ) as exporter:
+                for listing in listings:
+                    exporter.write(listing)
+        except (ImportError, ValueError, OSError) as e:
+            log.error(f"❌ Could not save listings: {e}")
+            return None
+        log.info(f"💾 {exporter.count} listings saved to {exporter.path}")
+        return exporter.count
+
+    # Else write to terminal
+    count = 0
+    for count, listing in enumerate(listings, start=1):
+        print(
+            f"{count}. {listing['address']} - {listing['price']} - {listing['beds']} beds - {listing['baths']} baths - link: {listing['link']}"
+        )
+    return count
+
+
 if __name__ == "__main__":
     # If run with -api, then start the server
     if args.server_api:
@@ -102,66 +182,33 @@ if __name__ == "__main__":
                 log.error("❌ No properties found matching the criteria.")
             else:
                 log.info(f"✅ Found {len(listings)} properties matching criteria.")
-
-                # If user wants to save as a CSV
-                if args.output:
-                    import csv
-
-                    keys = listings[0].keys()
-                    with open(
-                        args.output, "w", newline="", encoding="utf-8"
-                    ) as output_file:
-                        dict_writer = csv.DictWriter(output_file, fieldnames=keys)
-                        dict_writer.writeheader()
-                        dict_writer.writerows(listings)
-                    log.info(f"✅ Listings saved to {args.output}")
-                else:
-                    # Else write to terminal
-                    for idx, listing in enumerate(listings, start=1):
-                        print(
-                            f"{idx}. {listing['address']} - {listing['price']} - {listing['beds']} beds - {listing['baths']} baths - link: {listing['link']}"
-                        )
+                output_listings(listings)
 
         # Run main asynchronously
         asyncio.run(main())
 
     # If the -l flag is specified
     elif args.location:
-        from core.scraper import scrape_redfin
+        from core.scraper import fetch_redfin_html
+        from core.parser import iter_redfin_properties
         import asyncio
 
         # Define main separately so we can run asyncio
         async def main():
-            # Manually scrape listings
-            listings = await scrape_redfin(args.location, args.max_price)
-
-            # If there are no listings
-            if not listings:
+            # Manually scrape the search results page
+            html_content = await fetch_redfin_html(args.location)
+            if html_content is None:
                 log.error("❌ No listings found.")
                 return
 
-            log.info(f"✅ Found {len(listings)} listings:")
-
-            # If user wants to save file as a CSV
-            if args.output:
-                import csv
-
-                keys = listings[0].keys()
-                with open(
-                    args.output, "w", newline="", encoding="utf-8"
-                ) as output_file:
-                    dict_writer = csv.DictWriter(output_file, fieldnames=keys)
-                    dict_writer.writeheader()
-                    dict_writer.writerows(listings)
-                log.info(
-                    f"💾 Listings saved to {args.output}",
-                )
-            else:
-                # Else write to terminal
-                for idx, listing in enumerate(listings, start=1):
-                    print(
-                        f"{idx}. {listing['address']} - {listing['price']} - {listing['beds']} beds - {listing['baths']} baths - link: {listing['link']}"
-                    )
+            # Listings go out one by one as the parser yields them
+            count = output_listings(iter_redfin_properties(html_content, args.max_price))
+
+            # If there are no listings
+            if count == 0:
+                log.error("❌ No listings found.")
+            elif count:
+                log.info(f"✅ Found {count} listings.")
 
         asyncio.run(main())
     elif args.max_price:
@@ -0,0 +1,46 @@
+import os
+import json
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+START_URL = "https://www.redfin.com/city/16163/WA/Seattle/apartments-for-rent"
+
+
+def read_fixture(name: str):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class StubSite:
+    """
+    Local stand-in for Redfin behind the Playwright MCP server. Serves the stub
+    results page and snapshot, formatted the way the MCP server answers tool
+    calls, and follows `clicks` (element ref -> URL) when a control is clicked.
+    """
+
+    def __init__(self, clicks: dict | None = None):
+        self.url = None
+        self.html = read_fixture("redfin_results.html")
+        self.snapshot = read_fixture("redfin_snapshot.yaml")
+        self.clicks = clicks or {}
+        self.calls = []
+
+    def handle(self, tool_name: str, arguments: dict):
+        self.calls.append((tool_name, arguments))
+
+        if tool_name == "browser_evaluate":
+            return "### Result\n" + json.dumps(self.html)
+        if tool_name == "browser_navigate":
+            self.url = arguments["url"]
+        elif tool_name == "browser_click":
+            self.url = self.clicks.get(arguments.get("ref"), self.url)
+
+        return (
+            "### Page state\n"
+            f"- Page URL: {self.url}\n"
+            "- Page Snapshot:\n"
+            f"```yaml\n{self.snapshot}```\n"
+        )
+
+    def navigated_to(self):
+        return [args["url"] for name, args in self.calls if name == "browser_navigate"]
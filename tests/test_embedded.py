@@ -0,0 +1,75 @@
+import json
+from core.embedded import parse_embedded_listings
+from core.parser import iter_card_properties, iter_redfin_properties
+from conftest import read_fixture
+
+PINE = "https://www.redfin.com/WA/Seattle/100-Pine-St-98101/apartment/101"
+UNION = "https://www.redfin.com/WA/Seattle/200-Union-St-98101/apartment/202"
+LAKE = "https://www.redfin.com/WA/Seattle/300-Lake-Ave-98109/home/303"
+
+
+def embedded_by_link():
+    listings = parse_embedded_listings(read_fixture("redfin_embedded.html"))
+    return {listing["link"]: listing for listing in listings}
+
+
+def test_rental_payload_behind_api_prefix():
+    # The rentals search response sits in the server state as a "{}&&"-prefixed string
+    assert embedded_by_link()[PINE] == {
+        "address": "100 Pine St, Seattle, WA 98101",
+        "price": "$2,150/mo",
+        "beds": "1 bed",
+        "baths": "1 bath",
+        "sqft": "640",
+        "link": PINE,
+        "latitude": 47.6105,
+        "longitude": -122.3381,
+        "listing_id": "r-101",
+        "units": 2,
+    }
+
+
+def test_ld_json_residence():
+    assert embedded_by_link()[LAKE] == {
+        "address": "300 Lake Ave, Seattle, WA 98109",
+        "price": "N/A",
+        "beds": "N/A",
+        "baths": "N/A",
+        "sqft": "1,450",
+        "link": LAKE,
+        "latitude": 47.6262,
+        "longitude": -122.3385,
+        "listing_id": "303",
+        "units": "N/A",
+    }
+
+
+def test_duplicates_across_payloads_are_merged():
+    listings = parse_embedded_listings(read_fixture("redfin_embedded.html"))
+    union = embedded_by_link()[UNION]
+
+    assert [listing["link"] for listing in listings].count(UNION) == 1
+    # Price from the rentals API, coordinates only in the JSON-LD
+    assert union["price"] == "$2,450/mo"
+    assert (union["latitude"], union["longitude"]) == (47.6093, -122.3358)
+
+
+def test_embedded_listings_match_the_cards():
+    html = read_fixture("redfin_embedded.html")
+    listings = list(iter_redfin_properties(html))
+    cards = list(iter_card_properties(html))
+
+    assert [listing["listing_id"] for listing in listings] == ["r-101", "r-202"]
+    for listing, card in zip(listings, cards):
+        assert {field: listing[field] for field in card} == card
+
+
+def test_bad_payloads_are_skipped():
+    html = (
+        "<script>root.__reactServerState.InitialContext = {not json;</script>"
+        '<script type="application/ld+json">{"@type": </script>'
+        '<script type="application/ld+json">'
+        + json.dumps({"@type": "Organization", "name": "Redfin"})
+        + "</script>"
+    )
+    assert parse_embedded_listings(html) == []
@@ -0,0 +1,166 @@
+import json
+import random
+import pytest
+from core.geo import GeoIndex, OfflineGeocoder, haversine_miles, listing_coordinates
+
+SEATTLE = (47.6062, -122.3321)
+
+
+def listing(n: int, lat, lon, **fields):
+    return {
+        "address": f"{n} Test St, Seattle, WA 98101",
+        "price": "$2,000/mo",
+        "beds": "1 bed",
+        "link": f"https://www.redfin.com/WA/Seattle/{n}",
+        "latitude": lat,
+        "longitude": lon,
+        **fields,
+    }
+
+
+@pytest.fixture
+def scattered():
+    """Listings spread over ~20 miles around Seattle, plus a far away cluster."""
+    rng = random.Random(31)
+    listings = [
+        listing(n, SEATTLE[0] + rng.uniform(-0.3, 0.3), SEATTLE[1] + rng.uniform(-0.4, 0.4))
+        for n in range(400)
+    ]
+    listings += [
+        listing(1000 + n, 40.7 + rng.uniform(-0.1, 0.1), -74.0 + rng.uniform(-0.1, 0.1))
+        for n in range(20)
+    ]
+    index = GeoIndex()
+    index.add_many(listings)
+    return index, listings
+
+
+def brute_force(listings, lat, lon):
+    return sorted(
+        (haversine_miles(lat, lon, item["latitude"], item["longitude"]), item["link"])
+        for item in listings
+    )
+
+
+def test_listing_coordinates():
+    assert listing_coordinates({"latitude": "-33.87", "longitude": 151.21}) == (-33.87, 151.21)
+    assert listing_coordinates({"latitude": 47.6, "longitude": -122.3}) == (47.6, -122.3)
+    assert listing_coordinates({"latitude": "N/A", "longitude": -122.33}) is None
+    assert listing_coordinates({"latitude": 91, "longitude": 0}) is None
+    assert listing_coordinates({}) is None
+
+
+@pytest.mark.parametrize("miles", [0.5, 2, 10, 5000])
+def test_radius_matches_brute_force(scattered, miles):
+    index, listings = scattered
+    results = index.radius(*SEATTLE, miles)
+
+    expected = [(d, link) for d, link in brute_force(listings, *SEATTLE) if d <= miles]
+    assert [listing["link"] for _, listing in results] == [link for _, link in expected]
+    assert [d for d, _ in results] == pytest.approx([d for d, _ in expected])
+
+
+def test_bbox_matches_brute_force(scattered):
+    index, listings = scattered
+    box = (47.5, -122.5, 47.7, -122.2)
+
+    expected = {
+        item["link"]
+        for item in listings
+        if box[0] <= item["latitude"] <= box[2] and box[1] <= item["longitude"] <= box[3]
+    }
+    assert {item["link"] for item in index.bbox(*box)} == expected
+    # A box bigger than the grid goes over the occupied cells instead
+    assert len(index.bbox(-90, -180, 90, 180)) == len(listings)
+
+
+@pytest.mark.parametrize(
+    "point, k",
+    [(SEATTLE, 1), (SEATTLE, 15), ((47.9, -122.0), 7), ((45.0, -100.0), 5), (SEATTLE, 1000)],
+)
+def test_nearest_matches_brute_force(scattered, point, k):
+    index, listings = scattered
+    results = index.nearest(*point, k)
+
+    expected = brute_force(listings, *point)[:k]
+    assert [d for d, _ in results] == pytest.approx([d for d, _ in expected])
+
+
+def test_nearest_random_points_match_brute_force(scattered):
+    index, listings = scattered
+    rng = random.Random(7)
+    for _ in range(50):
+        point = SEATTLE[0] + rng.uniform(-0.5, 0.5), SEATTLE[1] + rng.uniform(-0.5, 0.5)
+        k = rng.randint(1, 30)
+        results = index.nearest(*point, k)
+        expected = brute_force(listings, *point)[:k]
+        assert [d for d, _ in results] == pytest.approx([d for d, _ in expected])
+
+
+def test_nearest_with_predicate(scattered):
+    index, listings = scattered
+    wanted = {item["link"] for item in listings[::3]}
+
+    results = index.nearest(*SEATTLE, 10, lambda item: item["link"] in wanted)
+
+    expected = brute_force([item for item in listings if item["link"] in wanted], *SEATTLE)
+    assert [d for d, _ in results] == pytest.approx([d for d, _ in expected[:10]])
+    assert index.nearest(*SEATTLE, 0) == []
+    assert GeoIndex().nearest(*SEATTLE, 5) == []
+
+
+def test_readding_a_listing_moves_it(scattered):
+    index, _ = scattered
+    size = len(index)
+
+    moved = listing(1, 40.71, -74.0)
+    index.add(moved)
+
+    assert len(index) == size
+    assert moved["link"] not in {item["link"] for item in index.bbox(47, -123, 48, -122)}
+    assert moved["link"] in {item["link"] for item in index.bbox(40, -75, 41, -73)}
+    assert not index.add(listing(5000, "N/A", "N/A"))
+
+
+def test_load_ndjson_keeps_latest_copy(tmp_path):
+    path = tmp_path / "listings.ndjson"
+    rows = [
+        listing(1, 47.61, -122.33, price="$2,000/mo"),
+        listing(2, 47.62, -122.34),
+        listing(1, 47.61, -122.33, price="$1,900/mo"),
+    ]
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\nnot json\n")
+
+    index = GeoIndex()
+    assert index.load_ndjson(str(path)) == 3
+    assert len(index) == 2
+    assert {item["price"] for item in index.listings()} == {"$1,900/mo", "$2,000/mo"}
+    assert index.nearest(47.61, -122.33, 1)[0][1]["price"] == "$1,900/mo"
+    assert GeoIndex().load_ndjson(str(tmp_path / "missing.ndjson")) == 0
+
+
+def test_geocoder_enrich(tmp_path):
+    table = tmp_path / "geocode.csv"
+    table.write_text(
+        "key,latitude,longitude\n"
+        "\"100 Pine St, Seattle, WA 98101\",47.6105,-122.3381\n"
+        "98109,47.6262,-122.3385\n"
+        "bad row,north,west\n"
+    )
+    geocoder = OfflineGeocoder(str(table))
+
+    # Exact address, case and punctuation don't matter
+    exact = geocoder.enrich(listing(1, "N/A", "N/A", address="100 PINE ST Seattle WA 98101"))
+    assert (exact["latitude"], exact["longitude"]) == (47.6105, -122.3381)
+
+    # Falls back to the ZIP centroid
+    by_zip = geocoder.enrich(listing(2, "N/A", "N/A", address="300 Lake Ave, Seattle, WA 98109"))
+    assert listing_coordinates(by_zip) == (47.6262, -122.3385)
+
+    # Listings with coordinates are left alone, unknown ones stay without
+    located = geocoder.enrich(listing(3, 47.0, -122.0, address="100 Pine St, Seattle, WA 98101"))
+    assert listing_coordinates(located) == (47.0, -122.0)
+    assert geocoder.enrich(listing(4, "N/A", "N/A", address="1 Main St, Portland, OR"))[
+        "latitude"
+    ] == "N/A"
+    assert geocoder.geocode("N/A") is None
@@ -0,0 +1,209 @@
+import json
+import time
+import asyncio
+import importlib
+import pytest
+from conftest import START_URL, StubSite
+
+pytest.importorskip("agents")
+pytest.importorskip("playwright")
+pytest.importorskip("spacy")
+
+from agents import Agent, function_tool, set_tracing_disabled  # noqa: E402
+from agents.items import ModelResponse  # noqa: E402
+from agents.mcp import MCPServerStdio  # noqa: E402
+from agents.models.interface import Model  # noqa: E402
+from agents.usage import Usage  # noqa: E402
+from mcp.types import CallToolResult, TextContent  # noqa: E402
+from openai.types.responses import (  # noqa: E402
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+)
+from ai.navigation import NavigationCache  # noqa: E402
+from core.traffic import TrafficGovernor  # noqa: E402
+
+FILTERED_URL = START_URL + "/filter/max-price=2.5k"
+
+
+def extract_locations(text: str):
+    """Stands in for the spaCy model, the tests only search Seattle."""
+    return ["Seattle"] if "Seattle" in text else []
+
+
+class FakeModel(Model):
+    """
+    Scripted navigator model: each turn clicks the next ref in `clicks`, then
+    answers `final`. Every turn takes `delay` seconds.
+    """
+
+    def __init__(self, clicks=(), final="FILTERS_APPLIED", delay: float = 0):
+        self.clicks = list(clicks)
+        self.final = final
+        self.delay = delay
+        self.turns = 0
+
+    async def get_response(self, *args, **kwargs):
+        self.turns += 1
+        await asyncio.sleep(self.delay)
+
+        if self.clicks:
+            item = ResponseFunctionToolCall(
+                id=f"fc_{self.turns}",
+                call_id=f"call_{self.turns}",
+                name="browser_click",
+                arguments=json.dumps({"ref": self.clicks.pop(0)}),
+                type="function_call",
+            )
+        else:
+            item = ResponseOutputMessage(
+                id=f"msg_{self.turns}",
+                content=[ResponseOutputText(text=self.final, type="output_text", annotations=[])],
+                role="assistant",
+                status="completed",
+                type="message",
+            )
+        return ModelResponse(output=[item], usage=Usage(), response_id=None)
+
+    async def stream_response(self, *args, **kwargs):
+        return
+        yield
+
+
+@pytest.fixture
+def mcp_client(tmp_path, monkeypatch):
+    # The module reads OPENAI_API_KEY from .env when it's imported
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env").write_text("OPENAI_API_KEY=sk-test\n")
+    set_tracing_disabled(True)
+
+    module = importlib.import_module("ai.mcp_client")
+    monkeypatch.setattr(module, "navigation_cache", NavigationCache(str(tmp_path / "nav.json")))
+    monkeypatch.setattr(module, "governor", TrafficGovernor(rate=1000, burst=1000))
+    monkeypatch.setattr(module, "navigator", None)
+    monkeypatch.setattr(module, "extract_locations", extract_locations)
+    return module
+
+
+@pytest.fixture
+def site():
+    return StubSite(clicks={"e14": FILTERED_URL, "e15": START_URL + "/filter/max-price=5k"})
+
+
+@pytest.fixture
+def mcp(mcp_client, site, monkeypatch):
+    """NavigatorMCPServer whose tool calls are answered by the stub site."""
+
+    async def call_tool(self, tool_name, arguments):
+        text = site.handle(tool_name, arguments)
+        return CallToolResult(content=[TextContent(type="text", text=text)])
+
+    monkeypatch.setattr(MCPServerStdio, "call_tool", call_tool)
+    return mcp_client.NavigatorMCPServer(name="Stub", params={"command": "true"})
+
+
+def use_model(mcp_client, mcp, model):
+    """Make the fake model the navigator, with a click tool going through the MCP server."""
+
+    @function_tool
+    async def browser_click(ref: str) -> str:
+        """Click an element on the page."""
+        result = await mcp.call_tool("browser_click", {"ref": ref})
+        return result.content[0].text
+
+    mcp_client.navigator = Agent(
+        name="NavigatorAgent",
+        model=model,
+        tools=[browser_click],
+        instructions=mcp_client.NAVIGATOR_INSTRUCTIONS,
+    )
+    return model
+
+
+def run_agent(mcp_client, mcp, filters, max_turns=8, time_budget=10):
+    def done(url):
+        return bool(filters) and mcp_client.filters_applied(url, filters)
+
+    return asyncio.run(
+        mcp_client._run_agent(mcp, "under $2500", done, max_turns, time_budget)
+    )
+
+
+def test_run_agent_stops_early_once_filters_are_in_url(mcp_client, mcp):
+    model = use_model(mcp_client, mcp, FakeModel(clicks=["e10", "e14"] + ["e10"] * 6))
+
+    assert run_agent(mcp_client, mcp, {"max_price": 2500}) is True
+    assert mcp.page_url == FILTERED_URL
+    assert model.turns < 8
+    assert mcp.on_page_url is None
+
+
+def test_run_agent_does_not_stop_on_wrong_value(mcp_client, mcp):
+    model = use_model(mcp_client, mcp, FakeModel(clicks=["e15"], final="still working"))
+
+    assert run_agent(mcp_client, mcp, {"max_price": 2500}) is False
+    assert model.turns == 2
+
+
+def test_run_agent_turn_budget(mcp_client, mcp):
+    model = use_model(mcp_client, mcp, FakeModel(clicks=["e10"] * 20))
+
+    assert run_agent(mcp_client, mcp, {"max_price": 2500}, max_turns=3) is False
+    assert model.turns == 3
+
+
+def test_run_agent_time_budget(mcp_client, mcp):
+    use_model(mcp_client, mcp, FakeModel(clicks=["e10"] * 20, delay=5))
+
+    started = time.monotonic()
+    assert run_agent(mcp_client, mcp, {"max_price": 2500}, time_budget=0.2) is False
+    assert time.monotonic() - started < 2
+
+
+def test_run_agent_final_answer(mcp_client, mcp):
+    use_model(mcp_client, mcp, FakeModel())
+
+    assert run_agent(mcp_client, mcp, {}) is True
+
+
+def test_navigator_run_is_learned_then_replayed(mcp_client, mcp, site):
+    use_model(mcp_client, mcp, FakeModel(clicks=["e14"]))
+    listings = asyncio.run(
+        mcp_client._run_navigator(mcp, "Find rentals in Seattle under $2500", START_URL, 8, 10)
+    )
+
+    assert [listing["price"] for listing in listings] == ["$2,150/mo", "$2,450/mo"]
+    assert mcp_client.navigation_cache.get("max_price") == {
+        "extra_tokens": [],
+        "price_unit": "k",
+    }
+
+    # Same kind of criteria, different value: straight to the built URL, no model turns
+    replay_model = use_model(mcp_client, mcp, FakeModel())
+    listings = asyncio.run(
+        mcp_client._run_navigator(mcp, "Find rentals in Seattle under $3000", START_URL, 8, 10)
+    )
+
+    assert len(listings) == 2
+    assert replay_model.turns == 0
+    assert site.navigated_to()[-1] == START_URL + "/filter/max-price=3k"
+
+
+def test_navigator_run_with_wrong_filters_is_not_learned(mcp_client, mcp):
+    use_model(mcp_client, mcp, FakeModel(clicks=["e15"]))
+    asyncio.run(
+        mcp_client._run_navigator(mcp, "Find rentals in Seattle under $2500", START_URL, 8, 10)
+    )
+
+    assert mcp_client.navigation_cache.entries == {}
+
+
+def test_unreplayable_criteria_always_use_the_navigator(mcp_client, mcp):
+    mcp_client.navigation_cache.entries["min_beds"] = {"extra_tokens": [], "price_unit": "k"}
+    model = use_model(mcp_client, mcp, FakeModel())
+
+    asyncio.run(
+        mcp_client._run_navigator(mcp, "Find rentals in Seattle with max 2 beds", START_URL, 8, 10)
+    )
+
+    assert model.turns == 1
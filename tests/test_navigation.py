@@ -0,0 +1,119 @@
+import pytest
+from ai.navigation import (
+    NavigationCache,
+    build_filter_url,
+    criteria_shape,
+    extract_filters,
+    filters_applied,
+    parse_filter_value,
+)
+from conftest import START_URL
+
+
+@pytest.mark.parametrize(
+    "criteria, filters",
+    [
+        ("2+ beds under $3k", {"min_beds": 2, "max_price": 3000}),
+        (
+            "apartments with at least 2 bedrooms and 1.5 baths under $2,500",
+            {"max_price": 2500, "min_beds": 2, "min_baths": 1.5},
+        ),
+        ("over $1,800 with ≥1 bath", {"min_price": 1800, "min_baths": 1}),
+        ("under 3 miles from work", {}),
+        # Upper bounds and ranges on rooms are not minimums
+        ("Find rentals in Seattle with max 2 beds", {}),
+        ("Find 1-2 bed rentals", {}),
+        ("2 beds or less under $3k", {"max_price": 3000}),
+        ("rentals $2000-$3000", {}),
+    ],
+)
+def test_extract_filters(criteria, filters):
+    assert extract_filters(criteria) == filters
+
+
+@pytest.mark.parametrize(
+    "criteria, shape",
+    [
+        ("Find rentals in Seattle under $2500", "max_price"),
+        ("Find 2+ bed apartments in Seattle under $3k", "max_price|min_beds"),
+        ("dog friendly 2 bed rentals in Seattle under $3k", "max_price|min_beds|+dogs"),
+        ("rentals in Seattle", ""),
+        # Anything we can't express is never replayed
+        ("Find rentals in Seattle with max 2 beds", None),
+        ("Find 1-2 bed rentals in Seattle", None),
+        ("rentals in Seattle between $2000 and $3000", None),
+        ("rentals in Seattle over 2000", None),
+        ("quiet rentals in Seattle under $2500", None),
+    ],
+)
+def test_criteria_shape(criteria, shape):
+    assert criteria_shape(criteria, ["Seattle"]) == shape
+
+
+@pytest.mark.parametrize(
+    "text, value",
+    [("2.5k", 2500), ("3K", 3000), ("1.2m", 1_200_000), ("1.5", 1.5), ("x", None)],
+)
+def test_parse_filter_value(text, value):
+    assert parse_filter_value(text) == value
+
+
+def test_filters_applied_compares_values():
+    url = START_URL + "/filter/max-price=2.5k,min-beds=2"
+
+    assert filters_applied(url, {"max_price": 2500, "min_beds": 2})
+    assert filters_applied(url, {"max_price": 2500})
+    assert not filters_applied(url, {"max_price": 5000})
+    assert not filters_applied(url, {"min_beds": 1})
+    assert not filters_applied(url, {"min_baths": 1})
+    assert not filters_applied(START_URL, {"max_price": 2500})
+
+
+def test_filters_applied_checks_extra_tokens():
+    url = START_URL + "/filter/max-price=2.5k,dogs-allowed"
+
+    assert filters_applied(url, {"max_price": 2500}, ["dogs-allowed"])
+    assert not filters_applied(url, {"max_price": 2500}, ["cats-allowed"])
+
+
+def test_build_filter_url():
+    entry = {"extra_tokens": ["dogs-allowed"], "price_unit": "k"}
+    url = build_filter_url(
+        START_URL + "/filter/max-price=5k?utm=1", {"max_price": 2500, "min_baths": 1.5}, entry
+    )
+
+    assert url == START_URL + "/filter/max-price=2.5k,min-baths=1.5,dogs-allowed"
+    assert build_filter_url(START_URL, {"max_price": 2500}, {"price_unit": ""}).endswith(
+        "/filter/max-price=2500"
+    )
+    assert build_filter_url(START_URL + "/", {}, {}) == START_URL
+
+
+def test_navigation_cache_round_trip(tmp_path):
+    path = str(tmp_path / "navigation.json")
+    cache = NavigationCache(path)
+    cache.learn(
+        "max_price|+dogs",
+        {"max_price": 2500},
+        START_URL + "/filter/max-price=2.5k,dogs-allowed",
+    )
+
+    entry = NavigationCache(path).get("max_price|+dogs")
+    assert entry == {"extra_tokens": ["dogs-allowed"], "price_unit": "k"}
+    assert build_filter_url(START_URL, {"max_price": 3000}, entry) == (
+        START_URL + "/filter/max-price=3k,dogs-allowed"
+    )
+
+    cache.forget("max_price|+dogs")
+    assert NavigationCache(path).get("max_price|+dogs") is None
+
+
+def test_navigation_cache_skips_unreplayable(tmp_path):
+    cache = NavigationCache(str(tmp_path / "navigation.json"))
+
+    # Shape we don't understand, and an amenity that never showed up in the URL
+    cache.learn(None, {"max_price": 2500}, START_URL + "/filter/max-price=2.5k")
+    cache.learn("max_price|+dogs", {"max_price": 2500}, START_URL + "/filter/max-price=2.5k")
+
+    assert cache.entries == {}
+    assert cache.get(None) is None
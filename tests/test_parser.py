@@ -0,0 +1,77 @@
+import json
+from core.parser import card_links, iter_card_properties, parse_number, parse_redfin_property
+from conftest import read_fixture
+
+PINE = "/WA/Seattle/100-Pine-St-98101/apartment/101"
+UNION = "/WA/Seattle/200-Union-St-98101/apartment/202"
+
+
+def with_server_state(html: str, homes: list[dict]):
+    script = (
+        "<script>root.__reactServerState.InitialContext = "
+        + json.dumps({"homes": homes})
+        + ";</script>"
+    )
+    return html.replace("</body>", script + "</body>")
+
+
+def home(url: str, price: int, street: str, beds: int = 1, sqft: int = 640):
+    return {
+        "latLong": {"value": {"latitude": 47.61, "longitude": -122.33}},
+        "price": {"value": price},
+        "url": url,
+        "streetLine": {"value": street},
+        "city": "Seattle",
+        "state": "WA",
+        "zip": "98101",
+        "beds": beds,
+        "baths": 1,
+        "sqFt": {"value": sqft},
+    }
+
+
+def test_card_links():
+    assert card_links(read_fixture("redfin_results.html")) == [
+        "https://www.redfin.com" + PINE,
+        "https://www.redfin.com" + UNION,
+    ]
+
+
+def test_embedded_listings_used_when_they_match_the_cards():
+    html = with_server_state(
+        read_fixture("redfin_results.html"),
+        [home(UNION, 2450, "200 Union St", beds=2, sqft=870), home(PINE, 2150, "100 Pine St")],
+    )
+    listings = parse_redfin_property(html)
+
+    # Same text as the cards, so a home's row doesn't depend on which path parsed it
+    cards = list(iter_card_properties(read_fixture("redfin_results.html")))
+    for listing, card in zip(listings, cards):
+        assert {field: listing[field] for field in card} == card
+    assert listings[0]["latitude"] == 47.61
+
+
+def test_stale_embedded_listings_fall_back_to_cards():
+    # Filters applied in the page since load: the server state still has the old results
+    html = with_server_state(
+        read_fixture("redfin_results.html"),
+        [
+            home(PINE, 2150, "100 Pine St"),
+            home("/WA/Seattle/300-Lake-Ave/apartment/3", 4800, "300 Lake Ave"),
+            home("/WA/Seattle/400-Hill-Rd/apartment/4", 5200, "400 Hill Rd"),
+        ],
+    )
+    listings = parse_redfin_property(html)
+
+    assert [listing["address"] for listing in listings] == [
+        "100 Pine St, Seattle, WA 98101",
+        "200 Union St, Seattle, WA 98101",
+    ]
+    assert listings[0]["latitude"] == 47.61
+    assert listings[1]["latitude"] == "N/A"
+
+
+def test_parse_number_ignores_dashes():
+    assert parse_number("Studio-2 beds") == 2.0
+    assert parse_number("1-2 beds") == 1.0
+
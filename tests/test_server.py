@@ -0,0 +1,112 @@
+import asyncio
+import importlib
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("agents")
+pytest.importorskip("playwright")
+pytest.importorskip("spacy")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from core.geo import GeoIndex  # noqa: E402
+
+PINE = (47.6105, -122.3381)
+
+
+def listing(n: int, lat, lon, beds="1 bed", price="$2,000/mo"):
+    return {
+        "address": f"{n} Test St, Seattle, WA 98101",
+        "price": price,
+        "beds": beds,
+        "baths": "1 bath",
+        "link": f"https://www.redfin.com/WA/Seattle/{n}",
+        "latitude": lat,
+        "longitude": lon,
+    }
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # ai.mcp_client reads OPENAI_API_KEY from .env when it's imported
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env").write_text("OPENAI_API_KEY=sk-test\n")
+
+    module = importlib.import_module("api.server")
+    monkeypatch.setattr(module, "listing_index", GeoIndex())
+    monkeypatch.setattr(module, "LISTINGS_STORE", str(tmp_path / "listings.ndjson"))
+    monkeypatch.setattr(module, "stored_rows", 0)
+    monkeypatch.setattr(module, "geocoder", None)
+    monkeypatch.setattr(module, "store_lock", asyncio.Lock())
+    return module
+
+
+@pytest.fixture
+def client(server):
+    server.listing_index.add_many(
+        [
+            listing(1, *PINE, beds="Studio", price="$1,600/mo"),
+            listing(2, 47.6150, -122.3400, beds="2 beds", price="$2,800/mo"),
+            listing(3, 47.6500, -122.3500, beds="3 beds", price="$3,500/mo"),
+            listing(4, 47.7500, -122.3000, beds="1 bed", price="$1,900/mo"),
+        ]
+    )
+    # No context manager, so the lifespan (browser, job workers) never starts
+    return TestClient(server.app)
+
+
+def links(response):
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "success"
+    assert body["count"] == len(body["properties"])
+    return [int(item["link"].rsplit("/", 1)[1]) for item in body["properties"]]
+
+
+def test_radius(client):
+    response = client.get("/listings/radius", params={"lat": PINE[0], "lon": PINE[1], "miles": 3})
+    assert links(response) == [1, 2, 3]
+    assert response.json()["properties"][0]["distance_miles"] == 0
+
+    filtered = client.get(
+        "/listings/radius",
+        params={"lat": PINE[0], "lon": PINE[1], "miles": 3, "min_beds": 2, "max_price": 3000},
+    )
+    assert links(filtered) == [2]
+
+
+def test_bbox(client):
+    params = {"min_lat": 47.6, "min_lon": -122.36, "max_lat": 47.7, "max_lon": -122.3}
+    assert sorted(links(client.get("/listings/bbox", params=params))) == [1, 2, 3]
+    assert links(client.get("/listings/bbox", params={**params, "min_beds": 3})) == [3]
+
+
+def test_nearest(client):
+    params = {"lat": 47.76, "lon": -122.3, "k": 2}
+    assert links(client.get("/listings/nearest", params=params)) == [4, 3]
+
+    # Studios count as 0 beds
+    assert links(
+        client.get("/listings/nearest", params={"lat": PINE[0], "lon": PINE[1], "k": 1, "min_beds": 0})
+    ) == [1]
+    assert links(
+        client.get("/listings/nearest", params={"lat": PINE[0], "lon": PINE[1], "k": 1, "min_beds": 1})
+    ) == [2]
+
+
+def test_store_listings_stays_compact(server, tmp_path):
+    scrape = [listing(n, 47.6 + n / 1000, -122.3) for n in range(10)]
+    no_coordinates = listing(99, "N/A", "N/A")
+
+    for _ in range(5):
+        asyncio.run(server.store_listings(scrape + [no_coordinates]))
+        rows = (tmp_path / "listings.ndjson").read_text().splitlines()
+        assert len(rows) <= 2 * len(scrape)
+
+    assert len(server.listing_index) == len(scrape)
+    assert not any("/99" in row for row in rows)
+
+    # A restart reindexes the store with one entry per listing
+    reloaded = GeoIndex()
+    reloaded.load_ndjson(str(tmp_path / "listings.ndjson"))
+    assert len(reloaded) == len(scrape)
@@ -0,0 +1,40 @@
+import pytest
+from conftest import read_fixture
+
+pytest.importorskip("spacy")
+
+from ai.utils import MAX_SNAPSHOT_LINES, trim_snapshot  # noqa: E402
+
+
+def snapshot_result(yaml: str):
+    return (
+        "### Page state\n"
+        "- Page URL: https://www.redfin.com/city/16163/WA/Seattle/apartments-for-rent\n"
+        f"- Page Snapshot:\n```yaml\n{yaml}```\n"
+    )
+
+
+def test_trim_snapshot_keeps_only_filter_controls():
+    trimmed = trim_snapshot(snapshot_result(read_fixture("redfin_snapshot.yaml")))
+
+    assert "Page Snapshot (filter controls only)" in trimmed
+    assert "- Page URL: https://www.redfin.com/city/16163" in trimmed
+    for kept in ('button "Price"', 'button "Beds / Baths"', 'combobox "Max price"',
+                 'option "$2,500"', 'checkbox "Dogs allowed"'):
+        assert kept in trimmed
+    for dropped in ("100 Pine St", "200 Union St", 'link "Sign In"', 'link "About"'):
+        assert dropped not in trimmed
+    assert trimmed.rstrip().endswith("```")
+
+
+def test_trim_snapshot_caps_lines():
+    yaml = "".join(f'- option "${n}" [ref=e{n}]\n' for n in range(MAX_SNAPSHOT_LINES + 50))
+    trimmed = trim_snapshot(snapshot_result(yaml))
+
+    assert trimmed.count("- option") == MAX_SNAPSHOT_LINES
+    assert "# ... snapshot truncated" in trimmed
+
+
+@pytest.mark.parametrize("text", ["### Result\nFILTERS_APPLIED", "Page Snapshot without yaml", None])
+def test_trim_snapshot_leaves_other_output_alone(text):
+    assert trim_snapshot(text) == text